@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -27,7 +29,8 @@ if not SECRET_KEY:
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = False
+# DJANGO_DEBUG=1 for local runserver: serves static files and tolerates a missing collectstatic manifest
+DEBUG = os.environ.get("DJANGO_DEBUG") == "1"
 
 ALLOWED_HOSTS = ["*", "98.86.152.78", "localhost", "127.0.0.1"]
 
@@ -45,7 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'incidents.middleware.RequestProfilingMiddleware',  # No-op unless INCIDENT_PROFILING
+    'incidents.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',  # Compress HTML responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,8 +66,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compile each template once per process
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -75,6 +87,43 @@ TEMPLATES = [
 WSGI_APPLICATION = 'Incident_MSystem.wsgi.application'
 
 
+# Request profiling (Server-Timing headers + slow-request log), off by default
+INCIDENT_PROFILING = os.environ.get("INCIDENT_PROFILING") == "1"
+INCIDENT_PROFILING_SLOW_MS = 500
+INCIDENT_PROFILING_SAMPLE_RATE = 0.01   # Share of requests run under cProfile
+INCIDENT_PROFILING_DUMP_DIR = BASE_DIR / "profiles"
+
+# Application metrics: each gunicorn worker snapshots into this directory and
+# /metrics/ sums them. Scrape with "Authorization: Bearer $INCIDENT_METRICS_TOKEN"
+# (without a token only logged-in superusers can read it).
+INCIDENT_METRICS = True
+INCIDENT_METRICS_DIR = os.environ.get("INCIDENT_METRICS_DIR", str(BASE_DIR / "metrics"))
+INCIDENT_METRICS_TOKEN = os.environ.get("INCIDENT_METRICS_TOKEN", "")
+
+# Rate limiting of incident and comment submissions: token buckets per user and
+# per client IP, kept in a small SQLite file every gunicorn worker shares.
+# Limits are (burst, seconds to refill it) per role; "ip" applies to every role.
+INCIDENT_RATE_LIMITING = os.environ.get("INCIDENT_RATE_LIMITING", "1") == "1"
+INCIDENT_RATE_LIMITS = {
+    "user": (10, 60),
+    "support": (30, 60),
+    "admin": (120, 60),
+    "ip": (60, 60),
+}
+INCIDENT_RATELIMIT_DB = os.environ.get("INCIDENT_RATELIMIT_DB", str(BASE_DIR / "ratelimit.sqlite3"))
+INCIDENT_RATELIMIT_IP_HEADER = "HTTP_X_REAL_IP"    # Set by nginx proxy_params
+# REMOTE_ADDR values whose IP header is believed. gunicorn reports "" for its unix socket;
+# add the proxy's address if nginx reaches gunicorn over TCP.
+INCIDENT_RATELIMIT_TRUSTED_PROXIES = [
+    addr.strip() for addr in os.environ.get("INCIDENT_RATELIMIT_TRUSTED_PROXIES", ",127.0.0.1,::1").split(",")
+]
+
+# Similar-incident suggestions: a TF-IDF index built by "manage.py build_similarity_index".
+# Workers reload it when the file changes and fold in newer edits every few seconds.
+INCIDENT_SIMILARITY_INDEX = os.environ.get("INCIDENT_SIMILARITY_INDEX", str(BASE_DIR / "similarity.joblib"))
+INCIDENT_SIMILARITY_REFRESH_SECONDS = 30
+
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -86,6 +135,44 @@ DATABASES = {
 }
 
 
+# Sessions and flash messages
+# INCIDENT_SESSION_BACKEND picks where sessions live:
+#   "cached_db"      - read from the shared "sessions" cache, written through to the DB (default)
+#   "signed_cookies" - no server-side storage at all (logout can't revoke copied cookies)
+#   "db"             - Django's original database-only backend
+SESSION_BACKENDS = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+INCIDENT_SESSION_BACKEND = os.environ.get("INCIDENT_SESSION_BACKEND", "cached_db")
+if INCIDENT_SESSION_BACKEND not in SESSION_BACKENDS:
+    raise ImproperlyConfigured(
+        f"INCIDENT_SESSION_BACKEND must be one of {', '.join(SESSION_BACKENDS)}, "
+        f"not {INCIDENT_SESSION_BACKEND!r}."
+    )
+SESSION_ENGINE = SESSION_BACKENDS[INCIDENT_SESSION_BACKEND]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Cached sessions must be visible to every gunicorn worker: with a per-process
+    # cache, logging out in one worker would leave the session alive in the others.
+    # One directory on the host is enough here; point it at Redis/memcached when
+    # running on more than one machine.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get("INCIDENT_SESSION_CACHE_DIR", str(BASE_DIR / "cache" / "sessions")),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+SESSION_CACHE_ALIAS = "sessions"
+
+# Flash messages ride in a signed cookie instead of the session
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -124,6 +211,17 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS: list[Path] = []
 
+# Hashed filenames + precompressed .gz/.br (see incidents/storage.py);
+# nginx serves them from STATIC_ROOT with immutable cache headers.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "incidents.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
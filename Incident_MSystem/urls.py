@@ -21,7 +21,7 @@ from django.contrib.auth import views as auth_views
 from django.conf import settings
 from django.conf.urls.static import static
 
-from incidents.views import login_redirect, logout_view
+from incidents.views import login_redirect, logout_view, metrics_endpoint
 
 urlpatterns = [
     path("", login_redirect, name="login_redirect"),
@@ -39,6 +39,7 @@ urlpatterns = [
     ),
 
     path("logout/", logout_view, name="logout"),
+    path("metrics/", metrics_endpoint, name="metrics"),  # Prometheus text format
 ]
 
 urlpatterns += static(
@@ -1,6 +1,50 @@
 # incidents/admin.py
 from django.contrib import admin
-from .models import Incident, IncidentComment
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+from .archive import restore_incident
+from .models import ArchivedIncident, ArchivedIncidentComment, Incident, IncidentComment, SupportWorkload
+from .search import search_incidents
+
+ESTIMATE_THRESHOLD = 10000  # Below this an exact COUNT(*) is cheap enough
+
+
+def estimate_rows(model):
+    # Row count from the planner statistics, or None when they have not been gathered
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # Written by ANALYZE (see archive.refresh_row_estimates); each stat starts with the row count
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None    # -1: never vacuumed or analyzed
+    return None
+
+
+class ApproximateCountPaginator(Paginator):  # Skips full-table COUNT(*) on large unfiltered lists
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, "query") and not queryset.query.where:
+            estimate = estimate_rows(queryset.model)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def _user_ids(username):
+    # Exact username match through the unique index
+    return User.objects.filter(username=username).values("id")
 
 
 @admin.register(Incident)
@@ -18,11 +62,86 @@ class IncidentAdmin(admin.ModelAdmin):      # Register Incident model in admin
     )
     list_filter = ("status", "severity", "is_visible_to_user",  # Filters for admin list view
                    "is_visible_to_support")
-    search_fields = ("title", "description",
-                     "created_by__username", "assigned_to__username")
+    list_select_related = ("created_by", "assigned_to")   # One JOIN instead of two lookups per row
+    autocomplete_fields = ("created_by", "assigned_to", "reporters")   # No <select> of every user
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    # Searched by get_search_results below: id, full-text title/description, exact username
+    search_fields = ("title",)
+    search_help_text = "Incident #, words from the title or description, or an exact username."
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.lstrip("#").isdigit():
+            return queryset.filter(pk=int(term.lstrip("#"))), False
+        matches = (
+            search_incidents(queryset, term)
+            | queryset.filter(created_by__in=_user_ids(term))
+            | queryset.filter(assigned_to__in=_user_ids(term))
+        )
+        return matches, False
 
 
 @admin.register(IncidentComment)
 class IncidentCommentAdmin(admin.ModelAdmin):  # Register IncidentComment model in admin
     list_display = ("id", "incident", "author", "created_at")
-    search_fields = ("text", "author__username", "incident__title")
+    list_select_related = ("incident", "author")
+    autocomplete_fields = ("incident", "author")
+    ordering = ("-id",)
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    search_fields = ("author__username",)
+    search_help_text = "Incident # or an exact author username."
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.lstrip("#").isdigit():
+            return queryset.filter(incident_id=int(term.lstrip("#"))), False
+        return queryset.filter(author__in=_user_ids(term)), False
+
+
+@admin.register(SupportWorkload)
+class SupportWorkloadAdmin(admin.ModelAdmin):  # Register SupportWorkload model in admin
+    list_display = ("user", "open_count", "open_weight", "last_assigned_at")
+    list_select_related = ("user",)
+    ordering = ("open_weight", "last_assigned_at")
+
+
+class ArchivedIncidentCommentInline(admin.TabularInline):  # Read-only comments of an archived incident
+    model = ArchivedIncidentComment
+    fields = ("author", "text", "created_at")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedIncident)
+class ArchivedIncidentAdmin(admin.ModelAdmin):  # Read-only archive with a restore action
+    list_display = ("id", "title", "severity", "status", "created_by", "assigned_to", "created_at", "archived_at")
+    list_filter = ("severity",)
+    list_select_related = ("created_by", "assigned_to")
+    search_fields = ("title", "created_by__username")
+    inlines = [ArchivedIncidentCommentInline]
+    actions = ["restore_selected"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Restore selected incidents")
+    def restore_selected(self, request, queryset):
+        ids = list(queryset.values_list("pk", flat=True))
+        for pk in ids:
+            restore_incident(pk)
+        self.message_user(request, f"Restored {len(ids)} incident(s).")
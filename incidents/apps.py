@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class IncidentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'incidents'
+
+    def ready(self):
+        from . import signals  # (registers workload tracking)
+        post_migrate.connect(signals.restore_search_triggers, sender=self)
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedIncident, ArchivedIncidentComment, Incident, IncidentComment
+
+DEFAULT_ARCHIVE_AFTER = timedelta(days=30)
+
+COMMENT_FIELDS = ["id", "incident_id", "author_id", "text", "created_at"]
+
+
+def archive_after() -> timedelta:
+    # Resolved incidents untouched for this long leave the hot table
+    days = getattr(settings, "INCIDENT_ARCHIVE_AFTER_DAYS", None)
+    return timedelta(days=days) if days is not None else DEFAULT_ARCHIVE_AFTER
+
+
+def _incident_fields():
+    # Every archived column except the archive timestamp mirrors an Incident column
+    return [
+        f.attname for f in ArchivedIncident._meta.concrete_fields
+        if f.name != "archived_at"
+    ]
+
+
+def archive_batch(ids) -> int:
+    # Copy incidents and their comments into the archive, then drop the originals
+    fields = _incident_fields()
+    with transaction.atomic():
+        rows = list(Incident.objects.filter(pk__in=ids, status="RESOLVED").values(*fields))
+        if not rows:
+            return 0
+        moved = [row["id"] for row in rows]
+        ArchivedIncident.objects.bulk_create([ArchivedIncident(**row) for row in rows])
+        ArchivedIncident.reporters.through.objects.bulk_create([
+            ArchivedIncident.reporters.through(archivedincident_id=incident_id, user_id=user_id)
+            for incident_id, user_id in Incident.reporters.through.objects.filter(
+                incident_id__in=moved).values_list("incident_id", "user_id")
+        ])
+        ArchivedIncidentComment.objects.bulk_create([
+            ArchivedIncidentComment(**row)
+            for row in IncidentComment.objects.filter(incident_id__in=moved).values(*COMMENT_FIELDS)
+        ])
+        Incident.objects.filter(pk__in=moved).delete()
+    return len(moved)
+
+
+def refresh_row_estimates():
+    # SQLite keeps no running row counts; ANALYZE records them in sqlite_stat1 for
+    # the admin's estimate_rows (PostgreSQL's autovacuum does this for reltuples)
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for model in (Incident, IncidentComment, ArchivedIncident, ArchivedIncidentComment):
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")  # nosec B608
+
+
+def archive_resolved(older_than=None, batch_size: int = 500) -> int:
+    # Walk the (status, updated_at) index in batches so each transaction stays short
+    cutoff = timezone.now() - (older_than if older_than is not None else archive_after())
+    archived = 0
+    while True:
+        ids = list(
+            Incident.objects.filter(status="RESOLVED", updated_at__lt=cutoff)
+            .order_by("updated_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        archived += archive_batch(ids)
+        if len(ids) < batch_size:
+            break
+    if archived:
+        refresh_row_estimates()
+    return archived
+
+
+def restore_incident(pk: int):
+    # Move one archived incident (with comments) back into the live tables
+    fields = _incident_fields()
+    with transaction.atomic():
+        archived = ArchivedIncident.objects.select_for_update().get(pk=pk)
+        data = {name: getattr(archived, name) for name in fields}
+        incident = Incident(**data)
+        Incident.objects.bulk_create([incident])   # No signals: it stays RESOLVED
+        incident.reporters.set(archived.reporters.all())
+        comments = [IncidentComment(**row) for row in archived.comments.values(*COMMENT_FIELDS)]
+        created_at = {comment.pk: comment.created_at for comment in comments}
+        IncidentComment.objects.bulk_create(comments)
+        # auto_now_add overwrites created_at on insert; put the originals back. updated_at
+        # keeps the insert time so the next archive run does not move it straight back.
+        Incident.objects.filter(pk=pk).update(created_at=archived.created_at)
+        for comment in comments:
+            comment.created_at = created_at[comment.pk]
+        IncidentComment.objects.bulk_update(comments, ["created_at"], batch_size=500)
+        archived.delete()
+    return Incident.objects.get(pk=pk)
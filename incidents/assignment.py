@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .metrics import UNASSIGNED_OPEN, adjust_counter, rebuild_queue_depth
+from .models import Incident, SupportWorkload
+
+# How much one open incident of each severity adds to a Support user's load
+SEVERITY_WEIGHTS = {
+    "CRITICAL": 8,
+    "HIGH": 4,
+    "MEDIUM": 2,
+    "LOW": 1,
+}
+
+OPEN_STATUSES = ["OPEN", "IN_PROGRESS"]
+
+
+def severity_weight(severity: str) -> int:
+    weights = getattr(settings, "INCIDENT_SEVERITY_WEIGHTS", SEVERITY_WEIGHTS)
+    return weights.get(severity, 1)
+
+
+def auto_assign_enabled() -> bool:
+    # Inline assignment on create is opt-in; the batch pass always works
+    return getattr(settings, "INCIDENT_AUTO_ASSIGN", False)
+
+
+def adjust_workload(user_id, count: int, weight: int) -> None:
+    # Apply a delta to one user's counters without reading them first
+    if not user_id or (count == 0 and weight == 0):
+        return
+    updated = SupportWorkload.objects.filter(user_id=user_id).update(
+        open_count=Greatest(F("open_count") + count, 0),
+        open_weight=Greatest(F("open_weight") + weight, 0),
+    )
+    if not updated and count > 0:
+        SupportWorkload.objects.get_or_create(
+            user_id=user_id,
+            defaults={"open_count": count, "open_weight": weight},
+        )
+
+
+def ensure_workload_rows() -> None:
+    # Every Support user needs a counter row to be a candidate
+    missing = User.objects.filter(groups__name="Support", workload__isnull=True)
+    SupportWorkload.objects.bulk_create(
+        [SupportWorkload(user=u) for u in missing],
+        ignore_conflicts=True,
+    )
+
+
+def _candidates():
+    # Least weighted load first; ties go to whoever waited longest (round-robin)
+    return (
+        SupportWorkload.objects.select_for_update()
+        .filter(user__groups__name="Support", user__is_active=True)
+        .order_by(
+            "open_weight",
+            F("last_assigned_at").asc(nulls_first=True),
+            "user_id",
+        )
+    )
+
+
+def pick_assignee():
+    workload = _candidates().first()
+    if workload is None:    # Support members added outside the app have no counter row yet
+        ensure_workload_rows()
+        workload = _candidates().first()
+    return workload
+
+
+def auto_assign(incident):
+    # Returns the chosen user, or None if the incident is locked or nobody is available
+    if incident.assigned_to_id is not None or incident.status not in OPEN_STATUSES:
+        return None
+
+    with transaction.atomic():
+        workload = pick_assignee()
+        if workload is None:
+            return None
+
+        # Conditional update keeps the assign-once lock under concurrency
+        claimed = Incident.objects.filter(
+            pk=incident.pk, assigned_to__isnull=True
+        ).update(assigned_to_id=workload.user_id)
+        if not claimed:
+            return None
+
+        SupportWorkload.objects.filter(pk=workload.pk).update(
+            open_count=F("open_count") + 1,
+            open_weight=F("open_weight") + severity_weight(incident.severity),
+            last_assigned_at=timezone.now(),
+        )
+        adjust_counter(UNASSIGNED_OPEN, -1)     # The update above bypasses signals
+
+    incident.assigned_to_id = workload.user_id
+    incident._loaded_workload = (incident.assigned_to_id, incident.status, incident.severity)
+    return workload.user
+
+
+def assign_backlog(limit=None) -> int:
+    # Batch pass over unassigned open incidents, most severe and oldest first
+    ensure_workload_rows()
+    if not SupportWorkload.objects.filter(user__groups__name="Support", user__is_active=True).exists():
+        return 0    # Nobody to assign to
+
+    severity_rank = Case(
+        *[When(severity=s, then=Value(w)) for s, w in SEVERITY_WEIGHTS.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    backlog = (
+        Incident.objects.filter(assigned_to__isnull=True, status__in=OPEN_STATUSES)
+        .only("id", "severity", "status", "assigned_to")
+        .annotate(severity_rank=severity_rank)
+        .order_by("-severity_rank", "created_at")
+    )
+    if limit:
+        backlog = backlog[:limit]
+
+    assigned = 0
+    for incident in list(backlog):
+        if auto_assign(incident) is not None:
+            assigned += 1
+    return assigned
+
+
+def rebuild_workload() -> None:
+    # Recompute all counters from the Incident table (repair / first deploy / bulk loads)
+    ensure_workload_rows()
+    with transaction.atomic():
+        SupportWorkload.objects.update(open_count=0, open_weight=0)
+        totals = {}
+        open_incidents = Incident.objects.filter(
+            assigned_to__isnull=False, status__in=OPEN_STATUSES
+        ).values_list("assigned_to_id", "severity")
+        for user_id, severity in open_incidents.iterator():
+            count, weight = totals.get(user_id, (0, 0))
+            totals[user_id] = (count + 1, weight + severity_weight(severity))
+        for user_id, (count, weight) in totals.items():
+            SupportWorkload.objects.update_or_create(
+                user_id=user_id,
+                defaults={"open_count": count, "open_weight": weight},
+            )
+        rebuild_queue_depth()
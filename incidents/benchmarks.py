@@ -0,0 +1,281 @@
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import refresh_row_estimates
+from .assignment import rebuild_workload
+from .dedup import compute_fingerprint
+from .models import Incident, IncidentComment
+from .sla import sla_policy
+
+BENCH_PREFIX = "bench_"
+
+# Per-scenario limits; p95 in milliseconds. Override with INCIDENT_BENCHMARK_BUDGETS.
+DEFAULT_BUDGETS = {
+    "admin_dashboard": {"p95_ms": 500, "max_queries": 15},
+    "admin_dashboard_filtered": {"p95_ms": 500, "max_queries": 15},
+    "support_dashboard": {"p95_ms": 500, "max_queries": 15},
+    "user_dashboard": {"p95_ms": 500, "max_queries": 12},
+    "incident_detail": {"p95_ms": 300, "max_queries": 12},
+    "create_incident_form": {"p95_ms": 200, "max_queries": 10},
+    "create_incident_post": {"p95_ms": 300, "max_queries": 20},
+}
+
+# Benchmarks post far faster than any person; keep the limiter's cost, not its 429s
+_UNTHROTTLED = {role: (10 ** 6, 1) for role in ("user", "support", "admin", "ip")}
+# Pages render without a collectstatic manifest, as in the tests
+_PLAIN_STATIC = {**settings.STORAGES,
+                 "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+# Synthetic traffic stays out of the live /metrics/ totals and INCIDENT_METRICS_DIR
+_BENCH_SETTINGS = {"INCIDENT_RATE_LIMITS": _UNTHROTTLED, "STORAGES": _PLAIN_STATIC, "INCIDENT_METRICS": False}
+
+_TITLES = [
+    "Disk usage {n}% on web-{h:02d}",
+    "VPN drops for site {h}",
+    "Payroll export failed (job {n})",
+    "Printer {h} offline",
+    "Email delivery delayed {n} min",
+    "Login timeout on portal node {h}",
+]
+_SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+_STATUSES = ["OPEN", "IN_PROGRESS", "RESOLVED"]
+
+
+def _bulk_users(names, password_hash):
+    existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+    User.objects.bulk_create([
+        User(username=name, password=password_hash)
+        for name in names if name not in existing
+    ])
+    return list(User.objects.filter(username__in=names))
+
+
+def generate_data(users=200, support=20, incidents=10000, comments=5, seed=0, password="bench-pass"):
+    # Build a realistic spread of reporters, Support staff, incidents and comments
+    rng = random.Random(seed)
+    password_hash = make_password(password)    # Hashing once keeps generation fast
+    now = timezone.now()
+
+    admin, _ = User.objects.get_or_create(
+        username=f"{BENCH_PREFIX}admin",
+        defaults={"password": password_hash, "is_superuser": True, "is_staff": True},
+    )
+    reporters = _bulk_users([f"{BENCH_PREFIX}user_{i}" for i in range(users)], password_hash)
+    staff = _bulk_users([f"{BENCH_PREFIX}support_{i}" for i in range(support)], password_hash)
+    support_group, _ = Group.objects.get_or_create(name="Support")
+    support_group.user_set.add(*staff)
+
+    created = 0
+    batch = []
+    for i in range(incidents):
+        severity = rng.choices(_SEVERITIES, weights=[1, 3, 6, 10])[0]
+        status = rng.choices(_STATUSES, weights=[3, 2, 5])[0]
+        title = rng.choice(_TITLES).format(n=rng.randint(1, 99), h=rng.randint(1, 40))
+        resolved = status == "RESOLVED"
+        batch.append(Incident(
+            title=title,
+            description=f"Synthetic incident {i}. " * rng.randint(1, 8),
+            severity=severity,
+            status=status,
+            created_by=rng.choice(reporters),
+            assigned_to=rng.choice(staff) if staff and rng.random() < 0.7 else None,
+            is_visible_to_user=not resolved,
+            is_visible_to_support=not resolved,
+            source="bench",
+            fingerprint=compute_fingerprint("bench", title, severity),
+        ))
+        if len(batch) == 1000:
+            created += _flush_incidents(batch, rng, reporters + staff, comments, now)
+            batch = []
+    if batch:
+        created += _flush_incidents(batch, rng, reporters + staff, comments, now)
+
+    rebuild_workload()  # bulk_create skips the signals that keep counters current
+    refresh_row_estimates()
+    return {"admin": admin.username, "users": len(reporters), "support": len(staff), "incidents": created}
+
+
+@transaction.atomic
+def _flush_incidents(batch, rng, authors, comments, now):
+    saved = Incident.objects.bulk_create(batch)
+    ids = [incident.pk for incident in saved]
+
+    # auto_now_add ignores explicit values, so spread creation times afterwards
+    for incident in saved:
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+        policy = sla_policy(incident.severity)
+        Incident.objects.filter(pk=incident.pk).update(
+            created_at=created_at,
+            updated_at=created_at,
+            last_seen_at=created_at,
+            response_due_at=created_at + policy["response"] if incident.status == "OPEN" else None,
+            resolve_due_at=created_at + policy["resolve"] if incident.status != "RESOLVED" else None,
+        )
+
+    if comments:
+        IncidentComment.objects.bulk_create([
+            IncidentComment(incident_id=pk, author=rng.choice(authors), text=f"Update {n} on incident {pk}")
+            for pk in ids
+            for n in range(rng.randint(0, comments * 2))
+        ])
+    return len(ids)
+
+
+def budgets():
+    configured = getattr(settings, "INCIDENT_BENCHMARK_BUDGETS", {})
+    merged = {name: dict(limits) for name, limits in DEFAULT_BUDGETS.items()}
+    for name, limits in configured.items():
+        merged.setdefault(name, {}).update(limits)
+    return merged
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class _QueryCounter:    # Counts queries without the 9000-entry cap of connection.queries
+    def __init__(self):
+        self.count = 0
+        self.session_count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        if "django_session" in sql:
+            self.session_count += 1
+        return execute(sql, params, many, context)
+
+
+def _measure(client, method, url, data, iterations):
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        # Each run is rolled back so POST scenarios don't grow the dataset
+        with transaction.atomic():
+            counter = _QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data or {})
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(counter.count)
+            transaction.set_rollback(True)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+    return {
+        "iterations": iterations,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(_percentile(timings, 95), 2),
+        "p99_ms": round(_percentile(timings, 99), 2),
+        "max_ms": round(max(timings), 2),
+        "queries": max(queries),
+    }
+
+
+def scenarios():
+    # (name, role, method, url, data); picks the heaviest rows so budgets reflect worst cases
+    admin = User.objects.filter(is_superuser=True).order_by("pk").first()
+    support = (
+        User.objects.filter(groups__name="Support")
+        .annotate(n=Count("incidents_assigned")).order_by("-n").first()
+    )
+    reporter = (
+        User.objects.filter(is_superuser=False, groups__isnull=True)
+        .annotate(n=Count("incidents_created")).order_by("-n").first()
+    )
+    busiest = Incident.objects.annotate(n=Count("comments")).order_by("-n").first()
+    if not (admin and support and reporter and busiest):
+        raise RuntimeError("Not enough data to benchmark; run generate_benchmark_data first.")
+
+    return [
+        ("admin_dashboard", admin, "get", reverse("admin_dashboard"), None),
+        ("admin_dashboard_filtered", admin, "get", reverse("admin_dashboard"),
+         {"status": "OPEN", "severity": "CRITICAL"}),
+        ("support_dashboard", support, "get", reverse("support_dashboard"), None),
+        ("user_dashboard", reporter, "get", reverse("user_dashboard"), None),
+        ("incident_detail", admin, "get", reverse("incident_detail", args=[busiest.pk]), None),
+        ("create_incident_form", reporter, "get", reverse("create_incident"), None),
+        ("create_incident_post", reporter, "post", reverse("create_incident"),
+         {"title": "Benchmark report", "description": "Synthetic", "severity": "LOW"}),
+    ]
+
+
+@override_settings(**_BENCH_SETTINGS)
+def run_benchmarks(iterations=20, only=None):
+    # Returns {"results": {...}, "failures": [...]} for every scenario
+    limits = budgets()
+    results = {}
+    failures = []
+    for name, user, method, url, data in scenarios():
+        if only and name not in only:
+            continue
+        client = Client()
+        client.force_login(user)
+        _measure(client, method, url, data, 1)  # Warm-up (template compile, caches)
+        result = _measure(client, method, url, data, iterations)
+        result["budget"] = limits.get(name, {})
+        results[name] = result
+
+        budget = result["budget"]
+        if "p95_ms" in budget and result["p95_ms"] > budget["p95_ms"]:
+            failures.append(f"{name}: p95 {result['p95_ms']}ms > {budget['p95_ms']}ms")
+        if "max_queries" in budget and result["queries"] > budget["max_queries"]:
+            failures.append(f"{name}: {result['queries']} queries > {budget['max_queries']}")
+    return {"results": results, "failures": failures}
+
+
+@override_settings(**_BENCH_SETTINGS)
+def benchmark_session_backends(iterations=20):
+    # Same read / POST+flash / read cycle under each session backend
+    reporter = (
+        User.objects.filter(is_superuser=False, groups__isnull=True)
+        .annotate(n=Count("incidents_created")).order_by("-n").first()
+    )
+    if reporter is None:
+        raise RuntimeError("Not enough data to benchmark; run generate_benchmark_data first.")
+    dashboard = reverse("user_dashboard")
+    create = reverse("create_incident")
+    post = {"title": "Session benchmark", "description": "Synthetic", "severity": "LOW"}
+
+    results = {}
+    for name, engine in settings.SESSION_BACKENDS.items():
+        for storage in ("django.contrib.messages.storage.fallback.FallbackStorage",
+                        "django.contrib.messages.storage.cookie.CookieStorage"):
+            with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=storage):
+                client = Client()
+                client.force_login(reporter)
+                timings = []
+                session_queries = []
+                for _ in range(iterations):
+                    with transaction.atomic():
+                        counter = _QueryCounter()
+                        with connection.execute_wrapper(counter):
+                            start = time.perf_counter()
+                            client.get(dashboard)
+                            client.post(create, post)
+                            client.get(dashboard)   # Consumes the flash message
+                            timings.append((time.perf_counter() - start) * 1000)
+                        session_queries.append(counter.session_count)
+                        transaction.set_rollback(True)
+            results[f"{name}+{storage.rsplit('.', 1)[-1]}"] = {
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(_percentile(timings, 95), 2),
+                "session_queries_per_cycle": max(session_queries),
+            }
+    return results
+
+
+def write_results(report, path):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
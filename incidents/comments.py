@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def page_size() -> int:
+    return getattr(settings, "INCIDENT_COMMENTS_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+
+
+def encode_cursor(comment) -> str:
+    # "<microseconds since epoch>-<id>" of the last comment on a page
+    return f"{(comment.created_at - _EPOCH) // _MICROSECOND}-{comment.pk}"
+
+
+def decode_cursor(cursor: str):
+    # Returns (created_at, id), or None for a missing / malformed cursor
+    try:
+        micros, pk = cursor.split("-", 1)
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def comment_page(comments, cursor=None, size=None):
+    # Newest-first keyset page; returns (comments, next_cursor or None)
+    size = size or page_size()
+    comments = comments.select_related("author").order_by("-created_at", "-id")
+
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        created_at, pk = position
+        comments = comments.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    page = list(comments[:size + 1])    # One extra row tells us whether more exist
+    if len(page) > size:
+        page = page[:size]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -1,3 +1,4 @@
+from .dedup import reported_by
 from .models import Incident
 
 
@@ -16,7 +17,7 @@ def role_flags(request):
             is_visible_to_support=True
         ).count()
         user_incidents = Incident.objects.filter(
-            created_by=user,
+            reported_by(user),
             is_visible_to_user=True
         ).count()
 
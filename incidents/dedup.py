@@ -0,0 +1,99 @@
+import hashlib
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Incident, IncidentComment
+
+# Volatile tokens replaced before hashing so "Disk 91% on web-03" and
+# "Disk 97% on web-07" end up as the same title template.
+_VOLATILE_PATTERNS = [
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b0x[0-9a-f]+\b"), "<hex>"),
+    (re.compile(r"\d+"), "<n>"),
+]
+_WHITESPACE = re.compile(r"\s+")
+
+DEFAULT_WINDOW = timedelta(minutes=30)
+
+
+def reported_by(user) -> Q:
+    # Incidents the user filed, or that absorbed one of their repeat reports
+    folded = Incident.reporters.through.objects.filter(user=user).values("incident_id")
+    return Q(created_by=user) | Q(pk__in=folded)
+
+
+def dedup_window() -> timedelta:
+    # How long an open incident keeps absorbing repeats after it was last seen
+    return getattr(settings, "INCIDENT_DEDUP_WINDOW", DEFAULT_WINDOW)
+
+
+def title_template(title: str) -> str:
+    template = (title or "").strip().lower()
+    for pattern, placeholder in _VOLATILE_PATTERNS:
+        template = pattern.sub(placeholder, template)
+    return _WHITESPACE.sub(" ", template)
+
+
+def compute_fingerprint(source: str, title: str, severity: str) -> str:
+    raw = f"{source}|{title_template(title)}|{severity}"
+    return hashlib.sha1(raw.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def find_open_duplicate(fingerprint: str):
+    # Single probe on the (fingerprint, status) index
+    if not fingerprint:
+        return None
+    cutoff = timezone.now() - dedup_window()
+    return (
+        Incident.objects.filter(
+            fingerprint=fingerprint,
+            status__in=["OPEN", "IN_PROGRESS"],
+            last_seen_at__gte=cutoff,
+        )
+        .order_by("-last_seen_at")
+        .first()
+    )
+
+
+def fold_into(incident, reporter, description: str = "") -> None:
+    # Atomic counter bump so concurrent repeats are not lost
+    now = timezone.now()
+    Incident.objects.filter(pk=incident.pk).update(
+        occurrence_count=F("occurrence_count") + 1,
+        last_seen_at=now,
+        updated_at=now,
+    )
+    incident.refresh_from_db(fields=["occurrence_count", "last_seen_at", "updated_at"])
+    if reporter.pk != incident.created_by_id:
+        incident.reporters.add(reporter)    # Their report now lives here; keep it on their dashboard
+
+    # Keep the reporter's own wording when it adds something new
+    description = (description or "").strip()
+    if description and description != incident.description.strip():
+        IncidentComment.objects.create(
+            incident=incident,
+            author=reporter,
+            text=f"Repeat report: {description}",
+        )
+
+
+def register_incident(incident, reporter):
+    # Save a new incident or fold it into a matching open one, whoever reported that.
+    # Returns (incident, created) where incident is the row that now holds the report.
+    incident.fingerprint = compute_fingerprint(incident.source, incident.title, incident.severity)
+
+    # Reports with attachments always get their own row so nothing is dropped
+    if not incident.attachment:
+        duplicate = find_open_duplicate(incident.fingerprint)
+        if duplicate is not None:
+            fold_into(duplicate, reporter, incident.description)
+            return duplicate, False
+
+    incident.last_seen_at = timezone.now()
+    incident.save()
+    return incident, True
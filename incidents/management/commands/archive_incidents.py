@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from incidents.archive import archive_resolved, restore_incident
+from incidents.models import ArchivedIncident
+
+
+class Command(BaseCommand):
+    help = "Move old resolved incidents and their comments into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="Archive incidents resolved more than this many days ago "
+                                 "(default: INCIDENT_ARCHIVE_AFTER_DAYS or 30).")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Incidents moved per transaction.")
+        parser.add_argument("--restore", type=int, metavar="ID", default=None,
+                            help="Restore one archived incident instead of archiving.")
+
+    def handle(self, *args, **options):
+        if options["restore"] is not None:
+            try:
+                incident = restore_incident(options["restore"])
+            except ArchivedIncident.DoesNotExist:
+                raise CommandError(f"Archived incident #{options['restore']} not found.")
+            self.stdout.write(self.style.SUCCESS(f"Restored incident #{incident.pk}."))
+            return
+
+        older_than = timedelta(days=options["days"]) if options["days"] is not None else None
+        archived = archive_resolved(older_than=older_than, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} incident(s)."))
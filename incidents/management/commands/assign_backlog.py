@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from incidents.assignment import assign_backlog, rebuild_workload
+
+
+class Command(BaseCommand):
+    help = "Auto-assign unassigned open incidents to Support users by workload."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None,
+                            help="Assign at most this many incidents.")
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Recompute workload counters before assigning.")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            rebuild_workload()
+            self.stdout.write("Workload counters rebuilt.")
+        assigned = assign_backlog(limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Assigned {assigned} incident(s)."))
@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from incidents.similarity import build_index, catch_up, index_path, loaded, save_index
+
+
+class Command(BaseCommand):
+    help = "Build (or bring up to date) the similar-incident TF-IDF index used by the detail and create pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--update", action="store_true",
+                            help="Fold in incidents changed since the last build instead of rebuilding.")
+        parser.add_argument("--batch-size", type=int, default=2000,
+                            help="Incidents tokenized per parallel batch.")
+        parser.add_argument("--jobs", type=int, default=-1,
+                            help="Worker processes for a full rebuild (-1 = one per CPU).")
+
+    def handle(self, *args, **options):
+        if options["update"] and os.path.exists(index_path()):
+            index = loaded.get()
+            added = 0
+            while True:
+                batch = catch_up(index, limit=options["batch_size"])
+                added += batch
+                if batch < options["batch_size"]:
+                    break
+            summary = f"Updated {added} incident(s)"
+        else:
+            index = build_index(batch_size=options["batch_size"], n_jobs=options["jobs"])
+            summary = f"Indexed {len(index)} incident(s)"
+        save_index(index)
+        self.stdout.write(self.style.SUCCESS(f"{summary}; wrote {index_path()}."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from incidents.sla import check_breaches
+
+
+class Command(BaseCommand):
+    help = "Escalate incidents whose SLA response or resolve deadline has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Rows fetched per deadline scan.")
+
+    def handle(self, *args, **options):
+        escalated = check_breaches(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Escalated {escalated['response']} response and "
+            f"{escalated['resolve']} resolve breach(es)."
+        ))
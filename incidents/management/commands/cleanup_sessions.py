@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+DB_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+class Command(BaseCommand):
+    help = ("Delete expired database sessions in small batches, so the SQLite "
+            "writer lock is never held for long (unlike clearsessions).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Sessions deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.05,
+                            help="Seconds to sleep between batches to let requests write.")
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_ENGINES:
+            self.stdout.write("Session engine keeps nothing in the database; nothing to clean.")
+            return
+
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .values_list("session_key", flat=True)[:options["batch_size"]]
+            )
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if len(keys) < options["batch_size"]:
+                break
+            time.sleep(options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired session(s)."))
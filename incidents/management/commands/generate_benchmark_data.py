@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from incidents.benchmarks import generate_data
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users, Support staff, incidents and comments for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200, help="Reporting users.")
+        parser.add_argument("--support", type=int, default=20, help="Support group members.")
+        parser.add_argument("--incidents", type=int, default=10000, help="Incidents to create.")
+        parser.add_argument("--comments", type=int, default=5, help="Average comments per incident.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for repeatable data.")
+        parser.add_argument("--password", default="bench-pass", help="Password for generated users.")
+
+    def handle(self, *args, **options):
+        summary = generate_data(
+            users=options["users"],
+            support=options["support"],
+            incidents=options["incidents"],
+            comments=options["comments"],
+            seed=options["seed"],
+            password=options["password"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary['incidents']} incidents for {summary['users']} users "
+            f"and {summary['support']} Support staff (admin: {summary['admin']})."
+        ))
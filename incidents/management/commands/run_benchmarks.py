@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from incidents.benchmarks import benchmark_session_backends, run_benchmarks, write_results
+
+
+class Command(BaseCommand):
+    help = "Measure latency percentiles and query counts per view and check them against budgets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20, help="Timed requests per scenario.")
+        parser.add_argument("--output", default="bench-results.json", help="Where to write JSON results.")
+        parser.add_argument("--only", nargs="*", default=None, help="Run just these scenarios.")
+        parser.add_argument("--sessions", action="store_true",
+                            help="Also compare session/message backends on a read-POST-read cycle.")
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(iterations=options["iterations"], only=options["only"])
+        if options["sessions"]:
+            report["sessions"] = benchmark_session_backends(iterations=options["iterations"])
+        write_results(report, options["output"])
+
+        for name, result in report["results"].items():
+            self.stdout.write(
+                f"{name:28} p50 {result['p50_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  "
+                f"p99 {result['p99_ms']:8.1f}ms  queries {result['queries']}"
+            )
+        for name, result in report.get("sessions", {}).items():
+            self.stdout.write(
+                f"session {name:42} p50 {result['p50_ms']:8.1f}ms  "
+                f"session queries/cycle {result['session_queries_per_cycle']}"
+            )
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if report["failures"]:
+            raise CommandError("Budget exceeded:\n  " + "\n  ".join(report["failures"]))
+        self.stdout.write(self.style.SUCCESS("All scenarios within budget."))
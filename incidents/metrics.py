@@ -0,0 +1,274 @@
+import atexit
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import Incident, StatCounter
+
+# Upper bounds (seconds) of the request latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNASSIGNED_OPEN = "unassigned_open"     # StatCounter row behind the queue-depth gauge
+
+HELP = {
+    "ims_http_requests_total": ("counter", "HTTP requests by view, method and status."),
+    "ims_http_request_duration_seconds": ("histogram", "HTTP request latency by view."),
+    "ims_db_queries_total": ("counter", "Database queries executed, by view."),
+    "ims_cache_requests_total": ("counter", "Cache lookups by cache alias and result."),
+    "ims_incidents_created_total": ("counter", "Incidents created, by severity."),
+    "ims_incidents_resolved_total": ("counter", "Incidents resolved, by severity."),
+    "ims_attachment_bytes_total": ("counter", "Attachment bytes uploaded."),
+    "ims_unassigned_incidents": ("gauge", "Open incidents waiting for an assignee."),
+}
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    # Process-local counters and histograms, snapshotted to one file per live worker
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._active = False
+
+    def activate(self):
+        # Called by MetricsMiddleware: only request-serving processes keep snapshots,
+        # so management commands and cron jobs never leave files behind
+        if self._active:
+            return
+        self._active = True
+        _fold_dead_workers()    # Includes a predecessor that had our pid
+        atexit.register(self.flush, force=True)
+
+    def deactivate(self):
+        # Stop writing snapshots (the test suite, once its temporary directory is gone)
+        self._active = False
+
+    def _after_fork(self):
+        # A forked worker starts from zero; the parent's counts stay in the parent's file
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._last_flush = 0.0
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, _key(labels))] += amount
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            hist = self._histograms.get((name, _key(labels)))
+            if hist is None:
+                hist = self._histograms[(name, _key(labels))] = [[0] * len(LATENCY_BUCKETS), 0, 0.0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist[0][i] += 1
+            hist[1] += 1
+            hist[2] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[n, list(map(list, k)), v] for (n, k), v in self._counters.items()],
+                "histograms": [[n, list(map(list, k)), h] for (n, k), h in self._histograms.items()],
+            }
+
+    def flush(self, force=False):
+        # Throttled atomic write of this worker's file
+        if not self._active or not (self._counters or self._histograms):
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < getattr(settings, "INCIDENT_METRICS_FLUSH_SECONDS", 1.0):
+            return
+        self._last_flush = now
+        directory = metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        _write_json(_worker_path(directory, os.getpid()), self.snapshot())
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry._after_fork)
+
+WORKER_FILE = re.compile(r"^worker-(\d+)\.json$")
+AGGREGATE_FILE = "aggregate.json"   # Totals of workers that have exited
+
+
+def _worker_path(directory, pid):
+    return os.path.join(directory, f"worker-{pid}.json")
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _add_snapshot(counters, histograms, data):
+    for name, labels, value in data["counters"]:
+        counters[(name, tuple(map(tuple, labels)))] += value
+    for name, labels, (buckets, count, total) in data["histograms"]:
+        merged = histograms.setdefault((name, tuple(map(tuple, labels))), [[0] * len(buckets), 0, 0.0])
+        merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+        merged[1] += count
+        merged[2] += total
+
+
+def _as_snapshot(counters, histograms):
+    return {
+        "counters": [[n, list(map(list, k)), v] for (n, k), v in counters.items()],
+        "histograms": [[n, list(map(list, k)), h] for (n, k), h in histograms.items()],
+    }
+
+
+@contextmanager
+def _directory_lock(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _fold_dead_workers(directory=None):
+    # Merge files of exited workers (and our pid's predecessor) into the aggregate,
+    # like prometheus_client's mark_process_dead, so the file count stays bounded
+    directory = directory or metrics_dir()
+    if not os.path.isdir(directory):
+        return
+    with _directory_lock(directory):
+        dead = []
+        for filename in os.listdir(directory):
+            match = WORKER_FILE.match(filename)
+            if match is None:
+                continue
+            pid = int(match.group(1))
+            if pid == os.getpid() and registry._last_flush:
+                continue    # Our own live file (before our first flush it can only be a predecessor's)
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            dead.append(os.path.join(directory, filename))
+        if not dead:
+            return
+        counters, histograms = defaultdict(float), {}
+        for path in [os.path.join(directory, AGGREGATE_FILE)] + dead:
+            data = _read_json(path)
+            if data is not None:
+                _add_snapshot(counters, histograms, data)
+        _write_json(os.path.join(directory, AGGREGATE_FILE), _as_snapshot(counters, histograms))
+        for path in dead:
+            os.remove(path)
+
+
+def metrics_dir():
+    return str(getattr(settings, "INCIDENT_METRICS_DIR", settings.BASE_DIR / "metrics"))
+
+
+def enabled() -> bool:
+    return getattr(settings, "INCIDENT_METRICS", True)
+
+
+def adjust_counter(name, delta) -> None:
+    # Durable cross-process counter kept in the database (no Incident reads)
+    if delta == 0:
+        return
+    if not StatCounter.objects.filter(name=name).update(value=F("value") + delta):
+        StatCounter.objects.get_or_create(name=name, defaults={"value": max(delta, 0)})
+
+
+def rebuild_queue_depth() -> None:
+    # Repair path only; scraping never counts incidents
+    depth = Incident.objects.filter(assigned_to__isnull=True, status__in=["OPEN", "IN_PROGRESS"]).count()
+    StatCounter.objects.update_or_create(name=UNASSIGNED_OPEN, defaults={"value": depth})
+
+
+def _merge():
+    # Sum the live workers' snapshots and the aggregate of exited ones
+    counters = defaultdict(float)
+    histograms = {}
+    registry.flush(force=True)
+    directory = metrics_dir()
+    _fold_dead_workers(directory)
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    for filename in names:
+        if filename != AGGREGATE_FILE and not WORKER_FILE.match(filename):
+            continue
+        try:
+            data = _read_json(os.path.join(directory, filename))
+        except (OSError, ValueError):
+            continue    # Being replaced right now; next scrape picks it up
+        if data is not None:
+            _add_snapshot(counters, histograms, data)
+    return counters, histograms
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    counters, histograms = _merge()
+    gauges = {
+        ("ims_unassigned_incidents", ()): StatCounter.objects.filter(name=UNASSIGNED_OPEN)
+        .values_list("value", flat=True).first() or 0,
+    }
+
+    lines = []
+    for metric, (kind, help_text) in HELP.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        if kind == "histogram":
+            for (name, labels), (buckets, count, total) in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                for bound, value in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f"{metric}_bucket{_labels(labels, [('le', bound)])} {value}")
+                lines.append(f"{metric}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{metric}_count{_labels(labels)} {count}")
+                lines.append(f"{metric}_sum{_labels(labels)} {total}")
+        else:
+            source = gauges if kind == "gauge" else counters
+            for (name, labels), value in sorted(source.items()):
+                if name == metric:
+                    lines.append(f"{metric}{_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
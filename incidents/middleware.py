@@ -0,0 +1,249 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Profile of the request currently being served, if any
+_current = ContextVar("incident_request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.query_count = 0
+        self.sql_ms = 0.0
+        self.statements = Counter()
+        self.render_ms = 0.0
+        self.render_depth = 0
+        self.processor_ms = Counter()
+
+    @property
+    def duplicate_queries(self) -> int:
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    @property
+    def context_ms(self) -> float:
+        return sum(self.processor_ms.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper: count, time and fingerprint every statement
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - start) * 1000
+            self.query_count += 1
+            self.statements[sql] += 1
+
+
+def _timed_processor(processor):
+    name = f"{processor.__module__}.{processor.__qualname__}"
+
+    @wraps(processor)
+    def wrapper(request):
+        profile = _current.get()
+        if profile is None:
+            return processor(request)
+        start = time.perf_counter()
+        try:
+            return processor(request)
+        finally:
+            profile.processor_ms[name] += (time.perf_counter() - start) * 1000
+
+    return wrapper
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return render(context, request)
+        profile.render_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(context, request)
+        finally:
+            profile.render_depth -= 1
+            if profile.render_depth == 0:   # Only the outermost render counts
+                profile.render_ms += (time.perf_counter() - start) * 1000
+
+    return wrapper
+
+
+def _timed_loader(load):
+    # Times render() on each template this backend hands out
+    @wraps(load)
+    def wrapper(*args, **kwargs):
+        template = load(*args, **kwargs)
+        template.render = _timed_render(template.render)
+        return template
+
+    return wrapper
+
+
+def _django_backends():
+    return [backend for backend in engines.all() if isinstance(backend, DjangoTemplates)]
+
+
+def _instrument_templates():
+    # Instance attributes on this process's Django template backends and engines;
+    # template classes are left alone and _uninstrument_templates() removes it all
+    for backend in _django_backends():
+        if "get_template" in backend.__dict__:
+            continue
+        backend.get_template = _timed_loader(backend.get_template)
+        backend.from_string = _timed_loader(backend.from_string)
+        engine = backend.engine
+        engine.__dict__["template_context_processors"] = tuple(
+            _timed_processor(p) for p in engine.template_context_processors
+        )
+
+
+def _uninstrument_templates():
+    for backend in _django_backends():
+        backend.__dict__.pop("get_template", None)
+        backend.__dict__.pop("from_string", None)
+        backend.engine.__dict__.pop("template_context_processors", None)   # cached_property recomputes it
+
+
+class RequestProfilingMiddleware:  # Opt-in SQL / template / context-processor accounting
+    def __init__(self, get_response):
+        if not getattr(settings, "INCIDENT_PROFILING", False):
+            raise MiddlewareNotUsed     # Django drops it at startup: zero cost when off
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "INCIDENT_PROFILING_SLOW_MS", 500)
+        self.sample_rate = getattr(settings, "INCIDENT_PROFILING_SAMPLE_RATE", 0.0)
+        self.dump_dir = getattr(settings, "INCIDENT_PROFILING_DUMP_DIR", None)
+        _instrument_templates()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = None
+        if self.dump_dir and self.sample_rate and random.random() < self.sample_rate:  # nosec B311
+            profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        try:
+            with connections["default"].execute_wrapper(profile):
+                if profiler is not None:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        response["Server-Timing"] = self.server_timing(profile, total_ms)
+        if total_ms >= self.slow_ms:
+            self.log_slow(request, response, profile, total_ms, profiler)
+        return response
+
+    @staticmethod
+    def server_timing(profile, total_ms) -> str:
+        template_ms = max(profile.render_ms - profile.context_ms, 0.0)
+        return ", ".join([
+            f'db;dur={profile.sql_ms:.1f};desc="{profile.query_count} queries"',
+            f'dupq;desc="{profile.duplicate_queries} duplicate queries"',
+            f"tpl;dur={template_ms:.1f}",
+            f"ctx;dur={profile.context_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+
+    def log_slow(self, request, response, profile, total_ms, profiler):
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "sql_ms": round(profile.sql_ms, 1),
+            "queries": profile.query_count,
+            "duplicate_queries": profile.duplicate_queries,
+            "template_ms": round(max(profile.render_ms - profile.context_ms, 0.0), 1),
+            "context_processors_ms": {k: round(v, 1) for k, v in profile.processor_ms.items()},
+            "top_duplicates": [
+                {"sql": sql[:200], "count": n}
+                for sql, n in profile.statements.most_common(3) if n > 1
+            ],
+        }
+        if profiler is not None:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            name = (record["view"] or "request").replace(":", "_")
+            path = os.path.join(self.dump_dir, f"{int(time.time() * 1000)}-{name}.prof")
+            profiler.dump_stats(path)
+            record["profile"] = path
+        logger.warning("Slow request %s", json.dumps(record))
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _counted_cache_get(get, alias):
+    missing = object()
+
+    @wraps(get)
+    def wrapper(key, default=None, version=None):
+        value = get(key, missing, version=version)
+        metrics.registry.inc("ims_cache_requests_total", cache=alias,
+                             result="miss" if value is missing else "hit")
+        return default if value is missing else value
+
+    wrapper.counted = True
+    return wrapper
+
+
+def _instrument_caches():
+    # Count hits and misses on this thread's cache instances, each under its own alias
+    for alias in settings.CACHES:
+        cache = caches[alias]   # One instance per alias and thread
+        if not getattr(cache.get, "counted", False):
+            cache.get = _counted_cache_get(cache.get, alias)
+
+
+class MetricsMiddleware:  # Feeds the process-local registry exposed at /metrics/
+    def __init__(self, get_response):
+        if not metrics.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.registry.activate()
+
+    def __call__(self, request):
+        _instrument_caches()
+        counter = _QueryCounter()
+        start = time.perf_counter()
+        with connections["default"].execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+        registry = metrics.registry
+        registry.inc("ims_http_requests_total", view=view, method=request.method, status=response.status_code)
+        registry.observe("ims_http_request_duration_seconds", elapsed, view=view)
+        registry.inc("ims_db_queries_total", counter.count, view=view)
+        registry.flush()
+        return response
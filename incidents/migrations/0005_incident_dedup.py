@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0004_alter_incident_severity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='occurrence_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='source',
+            field=models.CharField(default='web', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['fingerprint', 'status'], name='incident_fingerprint_idx'),
+        ),
+    ]
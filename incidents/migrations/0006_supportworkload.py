@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of incidents.assignment.SEVERITY_WEIGHTS as it stood when this migration was written
+WEIGHTS = {'CRITICAL': 8, 'HIGH': 4, 'MEDIUM': 2, 'LOW': 1}
+
+
+def seed_workload(apps, schema_editor):
+    # Counter rows for every Support member, loaded with the open incidents already assigned
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Incident = apps.get_model('incidents', 'Incident')
+    SupportWorkload = apps.get_model('incidents', 'SupportWorkload')
+    totals = {pk: (0, 0) for pk in User.objects.filter(groups__name='Support').values_list('pk', flat=True)}
+    open_incidents = Incident.objects.filter(
+        assigned_to__isnull=False, status__in=['OPEN', 'IN_PROGRESS']
+    ).values_list('assigned_to_id', 'severity')
+    for user_id, severity in open_incidents.iterator():
+        count, weight = totals.get(user_id, (0, 0))
+        totals[user_id] = (count + 1, weight + WEIGHTS.get(severity, 1))
+    SupportWorkload.objects.bulk_create([
+        SupportWorkload(user_id=user_id, open_count=count, open_weight=weight)
+        for user_id, (count, weight) in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0005_incident_dedup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupportWorkload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('open_count', models.PositiveIntegerField(default=0)),
+                ('open_weight', models.PositiveIntegerField(default=0)),
+                ('last_assigned_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='workload', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['open_weight', 'last_assigned_at'], name='workload_pick_idx')],
+            },
+        ),
+        migrations.RunPython(seed_workload, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:36
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+# Frozen copy of incidents.sla.DEFAULT_POLICIES as it stood when this migration was written
+POLICIES = {
+    'CRITICAL': {'response': timedelta(minutes=15), 'resolve': timedelta(hours=4)},
+    'HIGH': {'response': timedelta(hours=1), 'resolve': timedelta(hours=24)},
+    'MEDIUM': {'response': timedelta(hours=4), 'resolve': timedelta(days=3)},
+    'LOW': {'response': timedelta(days=1), 'resolve': timedelta(days=7)},
+}
+
+
+def stamp_open_incidents(apps, schema_editor):
+    # Give existing unresolved incidents deadlines measured from creation
+    Incident = apps.get_model('incidents', 'Incident')
+    for incident in Incident.objects.exclude(status='RESOLVED'):
+        policy = POLICIES.get(incident.severity, POLICIES['LOW'])
+        if incident.status == 'OPEN':
+            incident.response_due_at = incident.created_at + policy['response']
+        incident.resolve_due_at = incident.created_at + policy['resolve']
+        incident.save(update_fields=['response_due_at', 'resolve_due_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0006_supportworkload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='escalation_level',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='resolve_due_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='response_due_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='sla_breached_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(stamp_open_incidents, migrations.RunPython.noop),
+    ]
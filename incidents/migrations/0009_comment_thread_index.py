@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0008_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incidentcomment',
+            index=models.Index(fields=['incident', 'created_at', 'id'], name='comment_thread_idx'),
+        ),
+    ]
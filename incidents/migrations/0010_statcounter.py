@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:50
+
+from django.db import migrations, models
+
+
+def seed_queue_depth(apps, schema_editor):
+    Incident = apps.get_model('incidents', 'Incident')
+    StatCounter = apps.get_model('incidents', 'StatCounter')
+    depth = Incident.objects.filter(assigned_to__isnull=True, status__in=['OPEN', 'IN_PROGRESS']).count()
+    StatCounter.objects.create(name='unassigned_open', value=depth)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0009_comment_thread_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_queue_depth, migrations.RunPython.noop),
+    ]
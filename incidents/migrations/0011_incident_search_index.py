@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+FTS_SQL = [
+    # External-content FTS5 index over title + description, kept in sync by triggers
+    """CREATE VIRTUAL TABLE incidents_incident_fts USING fts5(
+        title, description, content='incidents_incident', content_rowid='id'
+    )""",
+    """CREATE TRIGGER incidents_incident_fts_ai AFTER INSERT ON incidents_incident BEGIN
+        INSERT INTO incidents_incident_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER incidents_incident_fts_ad AFTER DELETE ON incidents_incident BEGIN
+        INSERT INTO incidents_incident_fts(incidents_incident_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER incidents_incident_fts_au AFTER UPDATE OF title, description ON incidents_incident BEGIN
+        INSERT INTO incidents_incident_fts(incidents_incident_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO incidents_incident_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    "INSERT INTO incidents_incident_fts(incidents_incident_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS incidents_incident_fts_au",
+    "DROP TRIGGER IF EXISTS incidents_incident_fts_ad",
+    "DROP TRIGGER IF EXISTS incidents_incident_fts_ai",
+    "DROP TABLE IF EXISTS incidents_incident_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return  # Other databases fall back to indexed prefix search
+    for statement in FTS_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0010_statcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['created_at'], name='incident_created_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
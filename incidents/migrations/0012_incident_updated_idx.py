@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0011_incident_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['updated_at'], name='incident_updated_idx'),
+        ),
+    ]
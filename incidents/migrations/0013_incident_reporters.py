@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0012_incident_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedincident',
+            name='reporters',
+            field=models.ManyToManyField(blank=True, related_name='archived_incidents_reported', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='reporters',
+            field=models.ManyToManyField(blank=True, related_name='incidents_reported', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
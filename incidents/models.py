@@ -43,6 +43,12 @@ class Incident(models.Model):
         related_name="incidents_assigned",
     )
 
+    reporters = models.ManyToManyField(  # Other users whose repeat reports were folded in
+        settings.AUTH_USER_MODEL,
+        blank=True,
+        related_name="incidents_reported",
+    )
+
     is_visible_to_user = models.BooleanField(default=True)
     is_visible_to_support = models.BooleanField(default=True)
 
@@ -52,12 +58,48 @@ class Incident(models.Model):
         null=True,
     )
 
+    # Deduplication: repeats of an open incident are folded into it
+    source = models.CharField(max_length=50, default="web")  # Where the report came from
+    fingerprint = models.CharField(max_length=40, blank=True, default="")
+    occurrence_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    # SLA tracking: pending deadlines are cleared once met or escalated,
+    # so the breach scan only ever walks rows that are actually due
+    response_due_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    resolve_due_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    sla_breached_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    escalation_level = models.PositiveSmallIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Open-fingerprint lookup used on every new report
+            models.Index(fields=["fingerprint", "status"], name="incident_fingerprint_idx"),
+            # Archival scan: resolved incidents by age
+            models.Index(fields=["status", "updated_at"], name="incident_status_updated_idx"),
+            # Newest-first lists and the admin date hierarchy
+            models.Index(fields=["created_at"], name="incident_created_idx"),
+            # Similar-incident index catch-up: rows changed since its watermark
+            models.Index(fields=["updated_at"], name="incident_updated_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.title} ({self.get_status_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the workload counters currently account for
+        instance._loaded_workload = (
+            instance.__dict__.get("assigned_to_id"),
+            instance.__dict__.get("status"),
+            instance.__dict__.get("severity"),
+        )
+        return instance
+
     @property
     def image(self):  # Return attachment if it's an image
         return self.attachment
@@ -76,5 +118,101 @@ class IncidentComment(models.Model):  # Comments on incidents
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Cursor pagination of a thread on (created_at, id)
+            models.Index(fields=["incident", "created_at", "id"], name="comment_thread_idx"),
+        ]
+
     def __str__(self) -> str:  # String representation of the comment
         return f"Comment by {self.author} on {self.incident}"
+
+
+class SupportWorkload(models.Model):  # Running open workload per Support user
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="workload",
+    )
+    open_count = models.PositiveIntegerField(default=0)  # Unresolved incidents assigned
+    open_weight = models.PositiveIntegerField(default=0)  # Same, weighted by severity
+    last_assigned_at = models.DateTimeField(null=True, blank=True)  # Round-robin tie-break
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["open_weight", "last_assigned_at"], name="workload_pick_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} ({self.open_count} open, weight {self.open_weight})"
+
+
+class StatCounter(models.Model):  # Named cross-process counter (e.g. unassigned queue depth)
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.name} = {self.value}"
+
+
+class ArchivedIncident(models.Model):  # Resolved incident moved out of the hot table
+    id = models.BigIntegerField(primary_key=True)  # Keeps the original incident id
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    severity = models.CharField(max_length=10, choices=Incident.SEVERITY_CHOICES)
+    status = models.CharField(max_length=20, choices=Incident.STATUS_CHOICES)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_incidents_created",
+    )
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="archived_incidents_assigned",
+    )
+    reporters = models.ManyToManyField(
+        settings.AUTH_USER_MODEL,
+        blank=True,
+        related_name="archived_incidents_reported",
+    )
+
+    is_visible_to_user = models.BooleanField(default=False)
+    is_visible_to_support = models.BooleanField(default=False)
+    attachment = models.FileField(upload_to="attachments/", blank=True, null=True)
+
+    source = models.CharField(max_length=50, default="web")
+    fingerprint = models.CharField(max_length=40, blank=True, default="")
+    occurrence_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    sla_breached_at = models.DateTimeField(null=True, blank=True)
+    escalation_level = models.PositiveSmallIntegerField(default=0)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.title} ({self.get_status_display()}, archived)"
+
+
+class ArchivedIncidentComment(models.Model):  # Comments of an archived incident
+    id = models.BigIntegerField(primary_key=True)  # Keeps the original comment id
+    incident = models.ForeignKey(
+        ArchivedIncident,
+        on_delete=models.CASCADE,
+        related_name="comments",
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    text = models.TextField()
+    created_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"Comment by {self.author} on archived incident #{self.incident_id}"
@@ -0,0 +1,152 @@
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# (burst, seconds to refill the whole burst) per role, plus one bucket per client IP
+DEFAULT_LIMITS = {
+    "user": (10, 60),
+    "support": (30, 60),
+    "admin": (120, 60),
+    "ip": (60, 60),
+}
+
+_LOOPBACK = {"127.0.0.1", "::1", ""}
+_PRUNE_AFTER = 24 * 3600
+
+
+class BucketStore:
+    # Token buckets in a small SQLite file of their own, shared by every gunicorn
+    # worker on the host without touching the application database.
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():    # Never reuse across fork
+            conn = sqlite3.connect(self.path, timeout=0.5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # Losing buckets on a crash is harmless
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, buckets, now=None):
+        # buckets: [(key, capacity, refill_per_second)]. Spends one token from each
+        # only if all have one. Returns (allowed, retry_after_seconds).
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            for key, capacity, rate in buckets:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                levels.append((key, tokens, rate))
+
+            allowed = all(tokens >= 1 for _, tokens, _ in levels)
+            retry_after = 0.0
+            for key, tokens, rate in levels:
+                if allowed:
+                    tokens -= 1
+                elif tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+                conn.execute(
+                    "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens, now),
+                )
+            if random.random() < 0.01:  # nosec B311 - occasional pruning of idle buckets
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - _PRUNE_AFTER,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+
+_stores = {}
+
+
+def get_store():
+    path = getattr(settings, "INCIDENT_RATELIMIT_DB", settings.BASE_DIR / "ratelimit.sqlite3")
+    store = _stores.get(str(path))
+    if store is None:
+        store = _stores[str(path)] = BucketStore(path)
+    return store
+
+
+def client_ip(request) -> str:
+    # nginx (proxy_params) sets X-Real-IP; anyone else could send it, so it only
+    # counts when the request came through a trusted proxy
+    remote = request.META.get("REMOTE_ADDR", "")
+    header = getattr(settings, "INCIDENT_RATELIMIT_IP_HEADER", None)
+    trusted = getattr(settings, "INCIDENT_RATELIMIT_TRUSTED_PROXIES", ())
+    if header and remote in trusted and request.META.get(header):
+        return request.META[header].split(",")[0].strip()
+    return remote
+
+
+def role_of(user) -> str:
+    # Same roles as views.is_admin_user / is_support_user
+    if user.is_superuser:
+        return "admin"
+    if user.groups.filter(name="Support").exists():
+        return "support"
+    return "user"
+
+
+def buckets_for(request, scope):
+    limits = {**DEFAULT_LIMITS, **getattr(settings, "INCIDENT_RATE_LIMITS", {})}
+    burst, period = limits[role_of(request.user)]
+    buckets = [(f"{scope}:user:{request.user.pk}", burst, burst / period)]
+
+    ip = client_ip(request)
+    if ip not in _LOOPBACK:     # Local tools and health checks share 127.0.0.1
+        burst, period = limits["ip"]
+        buckets.append((f"{scope}:ip:{ip}", burst, burst / period))
+    return buckets
+
+
+def too_many_requests(retry_after) -> HttpResponse:
+    seconds = max(1, math.ceil(retry_after))
+    response = HttpResponse(
+        f"Too many submissions. Try again in {seconds} seconds.\n",
+        status=429,
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Retry-After"] = str(seconds)
+    return response
+
+
+def rate_limited(scope):
+    # Throttle POSTs to a view per user (limit by role) and per client IP
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method == "POST" and getattr(settings, "INCIDENT_RATE_LIMITING", True):
+                try:
+                    allowed, retry_after = get_store().take(buckets_for(request, scope))
+                except sqlite3.Error:
+                    logger.exception("Rate limit store unavailable; allowing request")
+                    allowed = True
+                if not allowed:
+                    return too_many_requests(retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+import re
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "incidents_incident_fts"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Same triggers as migration 0011. SQLite table rebuilds (most later AddField /
+# AlterField on Incident) drop them, so ensure_fts_triggers() puts them back.
+FTS_TRIGGERS = {
+    "incidents_incident_fts_ai": """CREATE TRIGGER IF NOT EXISTS incidents_incident_fts_ai
+        AFTER INSERT ON incidents_incident BEGIN
+        INSERT INTO incidents_incident_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    "incidents_incident_fts_ad": """CREATE TRIGGER IF NOT EXISTS incidents_incident_fts_ad
+        AFTER DELETE ON incidents_incident BEGIN
+        INSERT INTO incidents_incident_fts(incidents_incident_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    "incidents_incident_fts_au": """CREATE TRIGGER IF NOT EXISTS incidents_incident_fts_au
+        AFTER UPDATE OF title, description ON incidents_incident BEGIN
+        INSERT INTO incidents_incident_fts(incidents_incident_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO incidents_incident_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+}
+
+
+def fts_available() -> bool:
+    # The full-text index only exists on SQLite (see migration 0011)
+    return connection.vendor == "sqlite"
+
+
+def ensure_fts_triggers(using="default") -> list[str]:
+    # Recreate missing sync triggers and resync the index; returns the names restored
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND name IN (%s, %s, %s))",
+            [FTS_TABLE, *FTS_TRIGGERS],
+        )
+        present = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE not in present:
+            return []   # Migration 0011 not applied yet
+        missing = [name for name in FTS_TRIGGERS if name not in present]
+        for name in missing:
+            cursor.execute(FTS_TRIGGERS[name])
+        if missing:     # Rows changed while the triggers were gone
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")  # nosec B608
+    return missing
+
+
+def match_query(term: str) -> str:
+    # Every word must match, each as a prefix: "disk web" -> "disk"* AND "web"*
+    return " ".join(f'"{token}"*' for token in _TOKEN.findall(term))
+
+
+def search_incidents(queryset, term: str):
+    # Title/description search that goes through an index, never a LIKE '%term%' scan
+    query = match_query(term)
+    if not query:
+        return queryset.none()
+    if fts_available():
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",  # nosec B611
+            [query],
+        ))
+    return queryset.filter(title__istartswith=term)
@@ -0,0 +1,99 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .assignment import OPEN_STATUSES, adjust_workload, ensure_workload_rows, severity_weight
+from .metrics import UNASSIGNED_OPEN, adjust_counter, registry
+from .models import Incident
+from .search import ensure_fts_triggers
+from .similarity import loaded as similarity_index
+from .sla import clear_met_deadlines, restart_clock, stamp_deadlines
+
+
+logger = logging.getLogger(__name__)
+
+
+def _workload_share(state):
+    # (user_id, weight) an incident in this state contributes, or None
+    user_id, status, severity = state
+    if user_id is None or status not in OPEN_STATUSES:
+        return None
+    return user_id, severity_weight(severity)
+
+
+def _apply_change(old_state, new_state) -> None:
+    old = _workload_share(old_state)
+    new = _workload_share(new_state)
+    if old == new:
+        return
+    if old is not None:
+        adjust_workload(old[0], -1, -old[1])
+    if new is not None:
+        adjust_workload(new[0], 1, new[1])
+
+
+@receiver(pre_save, sender=Incident)
+def track_sla_deadlines(sender, instance, **kwargs):
+    if instance._state.adding:
+        if instance.resolve_due_at is None and instance.sla_breached_at is None:
+            stamp_deadlines(instance)
+    elif instance.status != "RESOLVED" and hasattr(instance, "_loaded_workload"):
+        _, old_status, old_severity = instance._loaded_workload
+        if old_status == "RESOLVED" or instance.severity != old_severity:    # Reopened or reclassified
+            restart_clock(instance)
+    clear_met_deadlines(instance)
+
+
+def _waiting(state) -> bool:
+    # Counts toward the unassigned queue depth gauge
+    user_id, status, severity = state
+    return status in OPEN_STATUSES and user_id is None
+
+
+def _track_metrics(old_state, new_state, created) -> None:
+    adjust_counter(UNASSIGNED_OPEN, int(_waiting(new_state)) - int(_waiting(old_state)))
+    if created:
+        registry.inc("ims_incidents_created_total", severity=new_state[2])
+    if new_state[1] == "RESOLVED" and old_state[1] != "RESOLVED":
+        registry.inc("ims_incidents_resolved_total", severity=new_state[2])
+
+
+@receiver(post_save, sender=Incident)
+def track_workload_on_save(sender, instance, created, **kwargs):
+    old_state = (None, None, None) if created else getattr(instance, "_loaded_workload", (None, None, None))
+    new_state = (instance.assigned_to_id, instance.status, instance.severity)
+    _apply_change(old_state, new_state)
+    _track_metrics(old_state, new_state, created)
+    if created and instance.attachment:
+        registry.inc("ims_attachment_bytes_total", instance.attachment.size)
+    instance._loaded_workload = new_state
+
+
+@receiver(post_save, sender=Incident)
+def index_incident_text(sender, instance, **kwargs):
+    similarity_index.note_saved(instance)
+
+
+@receiver(post_delete, sender=Incident)
+def track_workload_on_delete(sender, instance, **kwargs):
+    old_state = getattr(instance, "_loaded_workload", (None, None, None))
+    _apply_change(old_state, (None, None, None))
+    adjust_counter(UNASSIGNED_OPEN, -int(_waiting(old_state)))
+    # Deliberately left in the similarity index: archiving deletes the live row but the
+    # archived copy keeps the id, and ids of truly deleted rows match nothing at lookup
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def track_support_membership(sender, instance, action, **kwargs):
+    # New Support members become assignment candidates straight away
+    if action == "post_add":
+        ensure_workload_rows()
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    # Connected to post_migrate in IncidentsConfig.ready()
+    restored = ensure_fts_triggers(using)
+    if restored:
+        logger.warning("Recreated full-text search triggers %s and rebuilt the index", ", ".join(restored))
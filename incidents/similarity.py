@@ -0,0 +1,279 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain, islice
+
+import joblib
+from django.conf import settings
+from nltk.stem import PorterStemmer
+from nltk.tokenize import RegexpTokenizer
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 2        # A title word counts as much as two description words
+MAX_DF = 0.5            # On a large corpus, terms in more than half the incidents are skipped
+MAX_DF_MIN_DOCS = 1000  # (they carry little signal and would make every incident a candidate)
+CATCH_UP_LIMIT = 500    # Rows folded in per refresh, oldest change first
+
+STOP_WORDS = frozenset("""
+a about after again all also am an and any are as at be been before being but by can could did do
+does doing down during each few for from further had has have having he her here hers him his how i
+if in into is it its itself just me more most my no nor not now of off on once only or other our out
+over own same she should so some such than that the their them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your please hi hello thanks
+""".split())
+
+_tokenizer = RegexpTokenizer(r"[a-z][a-z0-9_]+")    # No punkt data needed; drops bare numbers
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=50000)
+def _stem(word: str) -> str:
+    return _stemmer.stem(word)
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(word) for word in _tokenizer.tokenize((text or "").lower()) if word not in STOP_WORDS]
+
+
+def term_weights(title: str, description: str) -> dict[str, float]:
+    # Log-scaled term frequencies of one incident's text
+    counts = Counter()
+    for term in tokenize(title):
+        counts[term] += TITLE_WEIGHT
+    counts.update(tokenize(description))
+    return {term: 1 + math.log(n) for term, n in counts.items()}
+
+
+def _best_first(heap):
+    while heap:
+        score, pk = heapq.heappop(heap)
+        yield pk, round(-score, 4)
+
+
+class SimilarityIndex:
+    # TF-IDF over an inverted index: a query only visits incidents sharing one of its terms
+
+    def __init__(self):
+        self.postings = defaultdict(dict)   # term -> {incident id: tf weight}
+        self.docs = {}                      # incident id -> {term: tf weight}
+        self.norms = {}                     # incident id -> vector length (idf as of indexing)
+        self.watermark = None               # updated_at of the newest change folded in
+
+    def __len__(self):
+        return len(self.docs)
+
+    def idf(self, term: str) -> float:
+        return math.log((1 + len(self.docs)) / (1 + len(self.postings.get(term, ())))) + 1
+
+    def _norm(self, terms) -> float:
+        return math.sqrt(sum((weight * self.idf(term)) ** 2 for term, weight in terms.items())) or 1.0
+
+    def _insert(self, pk, terms):
+        for term, weight in terms.items():
+            self.postings[term][pk] = weight
+        self.docs[pk] = terms
+
+    def add(self, pk, title, description):
+        self.remove(pk)
+        terms = term_weights(title, description)
+        self._insert(pk, terms)
+        self.norms[pk] = self._norm(terms)
+
+    def remove(self, pk):
+        for term in self.docs.pop(pk, ()):
+            posting = self.postings[term]
+            posting.pop(pk, None)
+            if not posting:
+                del self.postings[term]
+        self.norms.pop(pk, None)
+
+    def recompute_norms(self):
+        self.norms = {pk: self._norm(terms) for pk, terms in self.docs.items()}
+
+    def score_heap(self, title, description, exclude=()):
+        # Cosine scores of every incident sharing a query term, as a heap of
+        # (-score, incident id); reads the postings, so callers sharing the index hold its lock
+        terms = term_weights(title, description)
+        cutoff = MAX_DF * len(self.docs) if len(self.docs) >= MAX_DF_MIN_DOCS else len(self.docs)
+        scores = defaultdict(float)
+        query_norm = 0.0
+        for term, weight in terms.items():
+            posting = self.postings.get(term)
+            if not posting or len(posting) > cutoff:
+                continue
+            idf = self.idf(term)
+            query_weight = weight * idf
+            query_norm += query_weight ** 2
+            for pk, doc_weight in posting.items():
+                scores[pk] += query_weight * doc_weight * idf
+        for pk in exclude:
+            scores.pop(pk, None)
+        if not scores:
+            return []
+        query_norm = math.sqrt(query_norm)
+        heap = [(-score / (self.norms[pk] * query_norm), pk) for pk, score in scores.items()]
+        heapq.heapify(heap)
+        return heap
+
+    def ranked(self, title, description, exclude=()):
+        # Yields (incident id, cosine score) best first, lazily, so callers can keep
+        # pulling candidates until enough of them pass their own filters
+        return _best_first(self.score_heap(title, description, exclude))
+
+    def query(self, title, description, k=5, exclude=()):
+        # Returns [(incident id, cosine score)] best first
+        return list(islice(self.ranked(title, description, exclude), k))
+
+
+def _vectorize_batch(rows):
+    # Runs in a joblib worker: [(pk, title, description)] -> [(pk, term weights)]
+    return [(pk, term_weights(title, description)) for pk, title, description in rows]
+
+
+def _batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by("pk").values_list("pk", "title", "description")[:batch_size]
+        )
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def build_index(batch_size=2000, n_jobs=-1):
+    # Full rebuild over live and archived incidents (they share one id space);
+    # rows are read in keyset batches and tokenized in parallel
+    from django.utils import timezone
+    from .models import ArchivedIncident, Incident
+
+    index = SimilarityIndex()
+    index.watermark = timezone.now()
+    batches = chain(
+        _batches(Incident.objects.all(), batch_size),
+        _batches(ArchivedIncident.objects.all(), batch_size),
+    )
+    vectorized = joblib.Parallel(n_jobs=n_jobs)(joblib.delayed(_vectorize_batch)(rows) for rows in batches)
+    for batch in vectorized:
+        for pk, terms in batch:
+            index._insert(pk, terms)
+    index.recompute_norms()
+    return index
+
+
+def catch_up(index, limit=CATCH_UP_LIMIT) -> int:
+    # Fold in incidents changed since the index watermark
+    from .models import Incident
+
+    rows = Incident.objects.order_by("updated_at").values_list("pk", "title", "description", "updated_at")
+    if index.watermark is not None:
+        rows = rows.filter(updated_at__gte=index.watermark)
+    rows = list(rows[:limit])
+    for pk, title, description, updated_at in rows:
+        index.add(pk, title, description)
+        index.watermark = updated_at
+    return len(rows)
+
+
+def index_path() -> str:
+    return str(getattr(settings, "INCIDENT_SIMILARITY_INDEX", settings.BASE_DIR / "similarity.joblib"))
+
+
+def save_index(index, path=None):
+    path = path or index_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(index, tmp, compress=3)
+    os.replace(tmp, path)   # Readers never see a half-written file
+
+
+class _Loaded:
+    # This worker's copy of the index. A rewritten file is loaded on a background
+    # thread while requests keep using the copy already in memory.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.path = None
+        self.mtime = None
+        self.refreshed_at = 0.0
+        self.reloader = None
+
+    def get(self):
+        path = index_path()
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        with self.lock:
+            if self.index is None or path != self.path:
+                self._install(path, mtime, self._read(path, mtime))     # Nothing to serve yet
+            elif mtime is not None and mtime != self.mtime and self.reloader is None:
+                self.reloader = threading.Thread(
+                    target=self._reload, args=(path, mtime), name="similarity-reload", daemon=True)
+                self.reloader.start()
+            refresh = getattr(settings, "INCIDENT_SIMILARITY_REFRESH_SECONDS", 30)
+            if time.monotonic() - self.refreshed_at >= refresh:
+                catch_up(self.index)
+                self.refreshed_at = time.monotonic()
+            return self.index
+
+    def ranked(self, title, description, exclude=()):
+        index = self.get()
+        with self.lock:     # note_saved and catch_up change the postings under this lock
+            heap = index.score_heap(title, description, exclude)
+        return _best_first(heap)
+
+    @staticmethod
+    def _read(path, mtime):
+        from django.utils import timezone
+
+        if mtime is None:
+            logger.info("No similarity index at %s; run build_similarity_index", path)
+            index = SimilarityIndex()
+            index.watermark = timezone.now()    # Only incidents from here on, until a build
+            return index
+        return joblib.load(path)
+
+    def _install(self, path, mtime, index):
+        self.index, self.path, self.mtime = index, path, mtime
+        self.refreshed_at = 0.0     # Catch up from the file's watermark on the next get()
+
+    def _reload(self, path, mtime):
+        try:
+            index = self._read(path, mtime)
+        except Exception:
+            logger.exception("Could not reload similarity index from %s; keeping the loaded copy", path)
+            index = None
+        with self.lock:
+            if index is not None and path == self.path:
+                self._install(path, mtime, index)
+            else:
+                self.mtime = mtime  # Don't retry a broken file until it is rewritten
+            self.reloader = None
+
+    def note_saved(self, incident):
+        # Keep this worker's index current without waiting for the next refresh
+        with self.lock:
+            if self.index is not None:
+                self.index.add(incident.pk, incident.title, incident.description)
+
+
+loaded = _Loaded()
+
+
+def find_similar(title, description, k=5, exclude=()):
+    # [(incident id, score)] from the precomputed index; no scan of the Incident table
+    return list(islice(loaded.ranked(title, description, exclude), k))
+
+
+def iter_similar(title, description, exclude=()):
+    # Same ranking as find_similar, as a lazy best-first iterator
+    return loaded.ranked(title, description, exclude)
@@ -0,0 +1,102 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import mail_admins
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .assignment import auto_assign, auto_assign_enabled
+from .models import Incident
+
+logger = logging.getLogger(__name__)
+
+# Time allowed per severity before first response (leaving OPEN) and resolution
+DEFAULT_POLICIES = {
+    "CRITICAL": {"response": timedelta(minutes=15), "resolve": timedelta(hours=4)},
+    "HIGH": {"response": timedelta(hours=1), "resolve": timedelta(hours=24)},
+    "MEDIUM": {"response": timedelta(hours=4), "resolve": timedelta(days=3)},
+    "LOW": {"response": timedelta(days=1), "resolve": timedelta(days=7)},
+}
+
+# escalation_level values
+RESPONSE_BREACHED = 1
+RESOLVE_BREACHED = 2
+
+
+def sla_policy(severity: str) -> dict:
+    policies = getattr(settings, "INCIDENT_SLA_POLICIES", DEFAULT_POLICIES)
+    return policies.get(severity, DEFAULT_POLICIES["LOW"])
+
+
+def stamp_deadlines(incident, start=None) -> None:
+    # Set both deadlines from the severity policy
+    start = start or timezone.now()
+    policy = sla_policy(incident.severity)
+    incident.response_due_at = start + policy["response"]
+    incident.resolve_due_at = start + policy["resolve"]
+
+
+def restart_clock(incident, start=None) -> None:
+    # A reopened or reclassified incident is measured afresh under its current severity
+    stamp_deadlines(incident, start)
+    incident.sla_breached_at = None
+    incident.escalation_level = 0
+
+
+def clear_met_deadlines(incident) -> None:
+    # Drop deadlines that the current status already satisfies
+    if incident.status != "OPEN":
+        incident.response_due_at = None
+    if incident.status == "RESOLVED":
+        incident.resolve_due_at = None
+
+
+def _escalate(pk: int, due_field: str, level: int, now) -> bool:
+    # Claim the breach with a conditional update so reruns never escalate twice
+    return bool(
+        Incident.objects.filter(pk=pk, **{f"{due_field}__lte": now}).update(
+            **{due_field: None},
+            escalation_level=Greatest(F("escalation_level"), level),
+            sla_breached_at=Coalesce(F("sla_breached_at"), now),
+        )
+    )
+
+
+def _notify(incident, kind: str) -> None:
+    subject = f"SLA {kind} breach: incident #{incident.pk} ({incident.severity})"
+    logger.warning("%s - %s", subject, incident.title)
+    if getattr(settings, "ADMINS", None):
+        mail_admins(subject, f"{incident.title}\n\nStatus: {incident.status}", fail_silently=True)
+
+
+def check_breaches(now=None, batch_size: int = 500) -> dict:
+    # Range scans on the deadline indexes; cost is proportional to breaches, not open incidents
+    now = now or timezone.now()
+    escalated = {"response": 0, "resolve": 0}
+
+    for kind, due_field, level in (
+        ("response", "response_due_at", RESPONSE_BREACHED),
+        ("resolve", "resolve_due_at", RESOLVE_BREACHED),
+    ):
+        while True:
+            due_ids = list(
+                Incident.objects.filter(**{f"{due_field}__lte": now})
+                .order_by(due_field)
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not due_ids:
+                break
+            for pk in due_ids:
+                if not _escalate(pk, due_field, level, now):
+                    continue    # Already handled by another run
+                escalated[kind] += 1
+                incident = Incident.objects.get(pk=pk)
+                if kind == "response" and auto_assign_enabled():
+                    auto_assign(incident)   # Nobody picked it up yet; manual-assignment sites only get the alert
+                _notify(incident, kind)
+            if len(due_ids) < batch_size:
+                break
+
+    return escalated
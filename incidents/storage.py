@@ -0,0 +1,53 @@
+import gzip
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:    # Optional: only needed for .br variants
+    import brotli
+except ImportError:     # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = (".css", ".js", ".svg", ".txt", ".json", ".map", ".html")
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Content-hashed names (cacheable forever) plus precompressed .gz / .br
+    # siblings for nginx gzip_static / brotli_static.
+
+    def stored_name(self, name):
+        # In development, before collectstatic has run, fall back to the plain name.
+        # In production a missing entry means a stale deploy: fail instead of linking
+        # an unhashed file that nginx would mark immutable.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if not settings.DEBUG:
+                raise
+            logger.debug("No staticfiles manifest entry for %s; serving unhashed", name)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        for original, processed, was_processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and isinstance(processed, str) and processed.endswith(COMPRESSIBLE):
+                self._compress(processed)
+            yield original, processed, was_processed
+
+    def _compress(self, name):
+        path = self.path(name)
+        with open(path, "rb") as fh:
+            data = fh.read()
+
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):     # Skip variants that don't pay off
+                with open(path + suffix, "wb") as fh:
+                    fh.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
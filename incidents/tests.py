@@ -1,9 +1,79 @@
-from django.test import TestCase, Client
+import importlib
+import json
+import os
+import runpy
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import joblib
+from django.apps import apps
+from django.test import TestCase, Client, override_settings
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
 from django.contrib.auth.models import User, Group
-from incidents.models import Incident, IncidentComment
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
+from django.utils import timezone
+
+from incidents import admin as incident_admin
+from incidents.archive import archive_resolved, restore_incident
+from incidents.assignment import assign_backlog, auto_assign, rebuild_workload
+from incidents.benchmarks import DEFAULT_BUDGETS, generate_data, run_benchmarks
+from incidents.comments import comment_page
+from incidents.dedup import compute_fingerprint
+from incidents.metrics import UNASSIGNED_OPEN, Registry, registry, render_prometheus
+from incidents.middleware import RequestProfilingMiddleware, _uninstrument_templates
+from incidents.models import (
+    ArchivedIncident, Incident, IncidentComment, StatCounter, SupportWorkload,
+)
+from incidents.ratelimit import BucketStore
+from incidents.search import ensure_fts_triggers
+from incidents.similarity import build_index, loaded, save_index, tokenize
+from incidents.sla import check_breaches
+from incidents.storage import CompressedManifestStaticFilesStorage
+from incidents.views import user_dashboard
+
+# Metrics snapshots, rate-limit buckets and similarity indexes written during the run
+TEST_FILES = tempfile.mkdtemp(prefix='ims-tests-')
+PROJECT_STORAGES = settings.STORAGES
+unittest.addModuleCleanup(shutil.rmtree, TEST_FILES, ignore_errors=True)
+unittest.addModuleCleanup(registry.deactivate)     # No exit-time snapshot into the real directory
+
+
+@override_settings(
+    INCIDENT_RATE_LIMITING=False,    # RateLimitTest switches it back on
+    INCIDENT_METRICS_DIR=os.path.join(TEST_FILES, 'metrics'),
+    INCIDENT_RATELIMIT_DB=os.path.join(TEST_FILES, 'ratelimit.sqlite3'),
+    INCIDENT_SIMILARITY_INDEX=os.path.join(TEST_FILES, 'similarity.joblib'),
+    CACHES={**settings.CACHES, 'sessions': {**settings.CACHES['sessions'],
+                                            'LOCATION': os.path.join(TEST_FILES, 'sessions')}},
+    # No collectstatic manifest under test; StaticAssetPipelineTest uses the real storage
+    STORAGES={**settings.STORAGES,
+              'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class IncidentTestCase(TestCase):  # Keeps everything the app writes to disk out of the working tree
+    def use_settings(self, **overrides):    # Settings override for the rest of this test
+        override = override_settings(**overrides)
+        override.enable()
+        self.addCleanup(override.disable)
 
+    def temp_dir(self) -> str:
+        return tempfile.mkdtemp(dir=TEST_FILES)
 
-class IncidentModelTest(TestCase):  # Test Incident model
+
+class IncidentModelTest(IncidentTestCase):  # Test Incident model
     def setUp(self):  # Create test data
         self.user = User.objects.create_user(
             username='testuser',    # Create test user
@@ -50,7 +120,7 @@ class IncidentModelTest(TestCase):  # Test Incident model
         self.assertEqual(incident.severity, 'LOW')
 
 
-class IncidentCommentTest(TestCase):
+class IncidentCommentTest(IncidentTestCase):
     # Test IncidentComment model
 
     def setUp(self):
@@ -76,7 +146,7 @@ class IncidentCommentTest(TestCase):
         self.assertEqual(comment.incident, self.incident)
 
 
-class AuthenticationTest(TestCase):
+class AuthenticationTest(IncidentTestCase):
     # Test user authentication
 
     def setUp(self):
@@ -103,7 +173,7 @@ class AuthenticationTest(TestCase):
         self.assertTrue(self.user.check_password('testpass123'))
 
 
-class RoleBasedAccessTest(TestCase):     # Test role-based access control
+class RoleBasedAccessTest(IncidentTestCase):     # Test role-based access control
     def setUp(self):                     # Create groups and users
         self.admin_group, _ = Group.objects.get_or_create(name='Admin')  # Create Admin group
         self.support_group, _ = Group.objects.get_or_create(name='IT Support')  # Create IT Support group
@@ -126,7 +196,7 @@ class RoleBasedAccessTest(TestCase):     # Test role-based access control
         self.assertTrue(self.admin_user.groups.filter(name='Admin').exists())
 
 
-class IncidentCRUDTest(TestCase):   # Test CRUD operations for Incident model
+class IncidentCRUDTest(IncidentTestCase):   # Test CRUD operations for Incident model
 
     def setUp(self):  # set up test user and incident
         self.user = User.objects.create_user(
@@ -157,7 +227,7 @@ class IncidentCRUDTest(TestCase):   # Test CRUD operations for Incident model
         self.assertFalse(Incident.objects.filter(id=incident_id).exists())
 
 
-class InputValidationTest(TestCase):    # Test input validation
+class InputValidationTest(IncidentTestCase):    # Test input validation
     def setUp(self):        # Create test user
         self.user = User.objects.create_user(
             username='testuser',
@@ -178,3 +248,859 @@ class InputValidationTest(TestCase):    # Test input validation
             description='Test',
             created_by=self.user)
         self.assertEqual(len(incident.title), 200)
+
+
+class DeduplicationTest(IncidentTestCase):  # Test fingerprint-based folding of repeat reports
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='reporter',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='reporter2',
+            password='testpass123'
+        )
+
+    def _report(self, user, title, description='Disk full', severity='HIGH'):
+        self.client.force_login(user)
+        return self.client.post('/incidents/create/', {
+            'title': title,
+            'description': description,
+            'severity': severity,
+        })
+
+    def test_title_template_ignores_volatile_tokens(self):
+        self.assertEqual(
+            compute_fingerprint('web', 'Disk 91% on web-03', 'HIGH'),
+            compute_fingerprint('web', 'disk 97%  on WEB-07', 'HIGH'),
+        )
+        self.assertNotEqual(
+            compute_fingerprint('web', 'Disk 91% on web-03', 'HIGH'),
+            compute_fingerprint('web', 'Disk 91% on web-03', 'LOW'),
+        )
+
+    def test_repeat_report_is_folded(self):
+        self._report(self.user, 'Disk 91% on web-03')
+        self._report(self.other, 'Disk 97% on web-07', description='Disk full again')
+        self.assertEqual(Incident.objects.count(), 1)
+        incident = Incident.objects.get()
+        self.assertEqual(incident.occurrence_count, 2)
+        self.assertEqual(incident.comments.count(), 1)  # New wording kept as comment
+
+    def test_folded_report_stays_visible_to_its_reporter(self):
+        self._report(self.user, 'Disk 91% on web-03')
+        self._report(self.other, 'Disk 97% on web-07')     # Leaves the client logged in as self.other
+        incident = Incident.objects.get()
+        self.assertEqual(list(incident.reporters.all()), [self.other])
+        self.assertContains(self.client.get('/incidents/user/'), 'Disk 91% on web-03')
+        self.assertEqual(self.client.get(f'/incidents/{incident.pk}/').status_code, 200)
+        stranger = User.objects.create_user(username='stranger', password='testpass123')
+        self.client.force_login(stranger)
+        self.assertNotContains(self.client.get('/incidents/user/'), 'Disk 91% on web-03')
+        self.assertRedirects(self.client.get(f'/incidents/{incident.pk}/'), '/incidents/user/')
+
+    def test_reporters_survive_archive_and_restore(self):
+        self._report(self.user, 'Disk 91% on web-03')
+        self._report(self.other, 'Disk 97% on web-07')
+        incident = Incident.objects.get()
+        Incident.objects.update(status='RESOLVED', updated_at=timezone.now() - timedelta(days=60))
+        archive_resolved()
+        self.assertEqual(list(ArchivedIncident.objects.get().reporters.all()), [self.other])
+        self.assertEqual(list(restore_incident(incident.pk).reporters.all()), [self.other])
+
+    def test_resolved_incident_does_not_absorb_repeats(self):
+        self._report(self.user, 'Disk 91% on web-03')
+        Incident.objects.update(status='RESOLVED')
+        self._report(self.user, 'Disk 91% on web-03')
+        self.assertEqual(Incident.objects.count(), 2)
+
+    def test_repeat_outside_window_creates_new_incident(self):
+        self._report(self.user, 'Disk 91% on web-03')
+        Incident.objects.update(last_seen_at=timezone.now() - timedelta(days=1))
+        self._report(self.user, 'Disk 91% on web-03')
+        self.assertEqual(Incident.objects.count(), 2)
+
+
+class AutoAssignmentTest(IncidentTestCase):  # Test workload-based auto-assignment
+    def setUp(self):
+        self.support_group, _ = Group.objects.get_or_create(name='Support')
+        self.reporter = User.objects.create_user(username='reporter', password='testpass123')
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.alice.groups.add(self.support_group)
+        self.bob.groups.add(self.support_group)
+
+    def _incident(self, severity='LOW', **kwargs):
+        return Incident.objects.create(
+            title='Outage', description='x', severity=severity,
+            created_by=self.reporter, **kwargs)
+
+    def test_membership_creates_workload_rows(self):
+        self.assertEqual(SupportWorkload.objects.count(), 2)
+
+    def test_missing_workload_rows_are_created_on_demand(self):
+        SupportWorkload.objects.all().delete()     # e.g. Support members added before the table existed
+        self.assertIsNotNone(auto_assign(self._incident()))
+        self.assertEqual(SupportWorkload.objects.count(), 2)
+
+    def test_migration_seeds_existing_load(self):
+        self._incident(severity='HIGH', assigned_to=self.alice)
+        SupportWorkload.objects.all().delete()
+        migration = importlib.import_module('incidents.migrations.0006_supportworkload')
+        migration.seed_workload(apps, None)
+        loads = dict(SupportWorkload.objects.values_list('user__username', 'open_weight'))
+        self.assertEqual(loads, {'alice': 4, 'bob': 0})
+        self.assertEqual(auto_assign(self._incident()), self.bob)
+
+    def test_picks_least_loaded_user(self):
+        self._incident(severity='CRITICAL', assigned_to=self.alice)
+        incident = self._incident()
+        self.assertEqual(auto_assign(incident), self.bob)
+
+    def test_round_robin_on_equal_load(self):
+        first = auto_assign(self._incident())
+        Incident.objects.filter(assigned_to=first).update(status='RESOLVED')  # Bypasses signals
+        rebuild_workload()
+        second = auto_assign(self._incident())
+        self.assertNotEqual(first, second)
+
+    def test_respects_assignment_lock(self):
+        incident = self._incident(assigned_to=self.alice)
+        self.assertIsNone(auto_assign(incident))
+        incident.refresh_from_db()
+        self.assertEqual(incident.assigned_to, self.alice)
+
+    def test_resolving_releases_workload(self):
+        incident = self._incident(severity='HIGH', assigned_to=self.alice)
+        self.assertEqual(self.alice.workload.open_count, 1)
+        incident = Incident.objects.get(pk=incident.pk)
+        incident.status = 'RESOLVED'
+        incident.save()
+        self.alice.workload.refresh_from_db()
+        self.assertEqual(self.alice.workload.open_count, 0)
+        self.assertEqual(self.alice.workload.open_weight, 0)
+
+    def test_backlog_pass_assigns_all(self):
+        for _ in range(4):
+            self._incident()
+        self.assertEqual(assign_backlog(), 4)
+        self.assertFalse(Incident.objects.filter(assigned_to__isnull=True).exists())
+        self.assertEqual(Incident.objects.filter(assigned_to=self.alice).count(), 2)
+
+
+class SLATrackingTest(IncidentTestCase):    # Test SLA deadline stamping and escalation
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def _incident(self, severity='CRITICAL'):
+        return Incident.objects.create(
+            title='Outage', description='x', severity=severity, created_by=self.user)
+
+    def test_new_incident_gets_deadlines(self):
+        incident = self._incident()
+        self.assertIsNotNone(incident.response_due_at)
+        self.assertLess(incident.response_due_at, incident.resolve_due_at)
+
+    def test_met_deadlines_are_cleared(self):
+        incident = self._incident()
+        incident.status = 'IN_PROGRESS'
+        incident.save()
+        self.assertIsNone(incident.response_due_at)
+        self.assertIsNotNone(incident.resolve_due_at)
+        incident.status = 'RESOLVED'
+        incident.save()
+        self.assertIsNone(incident.resolve_due_at)
+
+    def test_breach_is_escalated_once(self):
+        incident = self._incident()
+        later = timezone.now() + timedelta(minutes=20)
+        with self.assertLogs('incidents.sla', level='WARNING'):
+            self.assertEqual(check_breaches(now=later)['response'], 1)
+        self.assertEqual(check_breaches(now=later)['response'], 0)  # Idempotent
+        incident.refresh_from_db()
+        self.assertEqual(incident.escalation_level, 1)
+        self.assertIsNotNone(incident.sla_breached_at)
+        self.assertIsNone(incident.response_due_at)
+
+    def test_breach_assigns_only_when_auto_assignment_is_on(self):
+        support = User.objects.create_user(username='alice', password='testpass123')
+        support.groups.add(Group.objects.get_or_create(name='Support')[0])
+        first, second = self._incident(), self._incident()
+        later = timezone.now() + timedelta(minutes=20)
+        with self.assertLogs('incidents.sla', level='WARNING'):
+            check_breaches(now=later)
+        self.assertFalse(Incident.objects.filter(assigned_to__isnull=False).exists())
+        Incident.objects.filter(pk=second.pk).update(response_due_at=later)
+        with override_settings(INCIDENT_AUTO_ASSIGN=True), self.assertLogs('incidents.sla', level='WARNING'):
+            check_breaches(now=later)
+        self.assertEqual(Incident.objects.get(pk=second.pk).assigned_to, support)
+        self.assertIsNone(Incident.objects.get(pk=first.pk).assigned_to)
+
+    def test_reopening_restarts_the_clock(self):
+        incident = self._incident()
+        with self.assertLogs('incidents.sla', level='WARNING'):
+            check_breaches(now=timezone.now() + timedelta(hours=5))
+        incident = Incident.objects.get(pk=incident.pk)
+        incident.status = 'RESOLVED'
+        incident.save()
+        incident.status = 'OPEN'
+        incident.save()
+        incident.refresh_from_db()
+        self.assertIsNone(incident.sla_breached_at)
+        self.assertEqual(incident.escalation_level, 0)
+        self.assertGreater(incident.response_due_at, timezone.now())
+        self.assertGreater(incident.resolve_due_at, incident.response_due_at)
+
+    def test_severity_change_restamps_deadlines(self):
+        incident = Incident.objects.get(pk=self._incident(severity='LOW').pk)
+        incident.severity = 'CRITICAL'
+        incident.save()
+        self.assertLess(incident.resolve_due_at, timezone.now() + timedelta(hours=5))
+        due = incident.resolve_due_at
+        incident.status = 'IN_PROGRESS'
+        incident.save()
+        self.assertIsNone(incident.response_due_at)
+        self.assertEqual(incident.resolve_due_at, due)  # Plain progress keeps the clock running
+
+    def test_nothing_due_means_no_escalation(self):
+        self._incident(severity='LOW')
+        self.assertEqual(check_breaches(), {'response': 0, 'resolve': 0})
+
+
+class ArchivalTest(IncidentTestCase):   # Test moving resolved incidents to the archive tier
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(username='boss', password='testpass123')
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.old = Incident.objects.create(
+            title='Old outage', description='x', created_by=self.user, status='RESOLVED')
+        IncidentComment.objects.create(incident=self.old, author=self.user, text='Fixed')
+        Incident.objects.filter(pk=self.old.pk).update(updated_at=timezone.now() - timedelta(days=60))
+        self.recent = Incident.objects.create(
+            title='Recent outage', description='x', created_by=self.user, status='RESOLVED')
+        self.open = Incident.objects.create(title='Ongoing', description='x', created_by=self.user)
+
+    def test_only_old_resolved_incidents_are_archived(self):
+        self.assertEqual(archive_resolved(), 1)
+        self.assertFalse(Incident.objects.filter(pk=self.old.pk).exists())
+        archived = ArchivedIncident.objects.get(pk=self.old.pk)
+        self.assertEqual(archived.comments.get().text, 'Fixed')
+        self.assertTrue(Incident.objects.filter(pk=self.recent.pk).exists())
+        self.assertTrue(Incident.objects.filter(pk=self.open.pk).exists())
+
+    def test_row_estimates_follow_archival(self):
+        archive_resolved()
+        self.assertEqual(incident_admin.estimate_rows(Incident), 2)     # Not MAX(id), which is still 3
+        self.assertEqual(incident_admin.estimate_rows(ArchivedIncident), 1)
+
+    def test_archived_incident_detail_is_read_only_for_admin(self):
+        archive_resolved()
+        self.client.force_login(self.admin)
+        response = self.client.get(f'/incidents/{self.old.pk}/')
+        self.assertContains(response, 'read-only')
+        self.assertContains(response, 'Fixed')
+        self.assertNotContains(response, 'Add comment')
+
+    def test_archived_incident_hidden_from_reporter(self):
+        archive_resolved()
+        self.client.force_login(self.user)
+        response = self.client.get(f'/incidents/{self.old.pk}/')
+        self.assertRedirects(response, '/incidents/user/')
+
+    def test_restore_brings_back_incident_and_comments(self):
+        created_at = self.old.created_at
+        comment_created_at = self.old.comments.get().created_at
+        archive_resolved()
+        restored = restore_incident(self.old.pk)
+        self.assertEqual(restored.created_at, created_at)
+        self.assertEqual(restored.comments.get().created_at, comment_created_at)
+        self.assertFalse(ArchivedIncident.objects.exists())
+
+    def test_restored_incident_is_not_archived_again(self):
+        archive_resolved()
+        restore_incident(self.old.pk)
+        self.assertEqual(archive_resolved(), 0)
+        self.assertTrue(Incident.objects.filter(pk=self.old.pk).exists())
+
+    def test_restore_query_count_does_not_grow_with_comments(self):
+        IncidentComment.objects.bulk_create([
+            IncidentComment(incident=self.old, author=self.user, text=f'note {i}') for i in range(50)
+        ])
+        archive_resolved()
+        with CaptureQueriesContext(connection) as queries:
+            restore_incident(self.old.pk)
+        self.assertLess(len(queries), 20)
+
+
+class CommentPaginationTest(IncidentTestCase):  # Test cursor-paginated comment threads
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.stranger = User.objects.create_user(username='stranger', password='testpass123')
+        self.incident = Incident.objects.create(
+            title='Long outage', description='x', created_by=self.user)
+        IncidentComment.objects.bulk_create([
+            IncidentComment(incident=self.incident, author=self.user, text=f'update {i}')
+            for i in range(30)
+        ])
+        self.client.force_login(self.user)
+
+    def test_pages_cover_thread_without_overlap(self):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = comment_page(self.incident.comments.all(), cursor, size=7)
+            seen.extend(c.pk for c in page)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_detail_renders_first_page_only(self):
+        response = self.client.get(f'/incidents/{self.incident.pk}/')
+        self.assertEqual(len(response.context['comments']), 25)
+        self.assertIsNotNone(response.context['next_cursor'])
+        self.assertContains(response, 'Load older comments')
+
+    def test_fragment_endpoint_returns_older_page(self):
+        first = self.client.get(f'/incidents/{self.incident.pk}/')
+        response = self.client.get(
+            f'/incidents/{self.incident.pk}/comments/',
+            {'cursor': first.context['next_cursor']},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode().count('<li>'), 5)
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_fragment_endpoint_enforces_visibility(self):
+        self.client.force_login(self.stranger)
+        response = self.client.get(f'/incidents/{self.incident.pk}/comments/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_ajax_post_returns_new_comment_only(self):
+        response = self.client.post(
+            f'/incidents/{self.incident.pk}/',
+            {'text': 'Fresh update'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertContains(response, 'Fresh update', status_code=201)
+        self.assertNotContains(response, '<html', status_code=201)
+
+    def test_plain_post_still_redirects(self):
+        response = self.client.post(f'/incidents/{self.incident.pk}/', {'text': 'Plain'})
+        self.assertRedirects(response, f'/incidents/{self.incident.pk}/')
+
+
+class BenchmarkSuiteTest(IncidentTestCase):     # Test the data generator and budget checks
+    def setUp(self):
+        self.summary = generate_data(users=5, support=2, incidents=40, comments=2, seed=1)
+
+    def test_generator_builds_requested_volume(self):
+        self.assertEqual(self.summary['incidents'], 40)
+        self.assertEqual(User.objects.filter(groups__name='Support').count(), 2)
+        self.assertTrue(IncidentComment.objects.exists())
+
+    def test_results_are_written_and_post_is_rolled_back(self):
+        before = Incident.objects.count()
+        path = os.path.join(self.temp_dir(), 'bench.json')
+        no_time_limits = {name: {'p95_ms': 60000} for name in DEFAULT_BUDGETS}     # Only query budgets are stable
+        with override_settings(INCIDENT_BENCHMARK_BUDGETS=no_time_limits):
+            call_command('run_benchmarks', iterations=2, output=path, stdout=StringIO())
+        with open(path) as fh:
+            report = json.load(fh)
+        self.assertIn('admin_dashboard', report['results'])
+        self.assertEqual(report['failures'], [])
+        self.assertEqual(Incident.objects.count(), before)
+
+    def test_runs_without_collectstatic_manifest(self):
+        with override_settings(STORAGES=PROJECT_STORAGES):
+            report = run_benchmarks(iterations=1, only=['user_dashboard'])
+        self.assertIn('user_dashboard', report['results'])
+
+    def test_run_leaves_no_metrics_snapshot(self):
+        metrics_dir = os.path.join(self.temp_dir(), 'metrics')
+        with override_settings(INCIDENT_METRICS_DIR=metrics_dir):
+            run_benchmarks(iterations=1, only=['user_dashboard', 'create_incident_post'])
+        self.assertFalse(os.path.exists(metrics_dir))
+
+    def test_exceeded_budget_fails(self):
+        with override_settings(INCIDENT_BENCHMARK_BUDGETS={'user_dashboard': {'max_queries': 1}}):
+            report = run_benchmarks(iterations=1, only=['user_dashboard'])
+        self.assertEqual(len(report['failures']), 1)
+
+
+class RequestProfilingTest(IncidentTestCase):   # Test the opt-in profiling middleware
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Incident.objects.create(title='Outage', description='x', created_by=self.user)
+
+    def _get(self, **overrides):
+        request = RequestFactory().get('/incidents/user/')
+        request.user = self.user
+        request.session = {}
+        request._messages = []
+        with override_settings(**overrides):
+            middleware = RequestProfilingMiddleware(user_dashboard)
+        self.addCleanup(_uninstrument_templates)
+        return middleware(request)
+
+    def test_disabled_by_default(self):
+        with override_settings(INCIDENT_PROFILING=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                RequestProfilingMiddleware(lambda request: None)
+
+    def test_server_timing_header(self):
+        response = self._get(INCIDENT_PROFILING=True)
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('ctx;dur=', timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    def test_instrumentation_is_undone(self):
+        self._get(INCIDENT_PROFILING=True)
+        _uninstrument_templates()
+        backend = engines['django']
+        self.assertNotIn('get_template', backend.__dict__)
+        self.assertFalse(any(hasattr(p, '__wrapped__') for p in backend.engine.template_context_processors))
+        self.assertFalse(hasattr(backend.get_template('incidents/base.html').render, '__wrapped__'))
+
+    def test_slow_request_is_logged(self):
+        with self.assertLogs('incidents.middleware', level='WARNING') as logs:
+            self._get(INCIDENT_PROFILING=True, INCIDENT_PROFILING_SLOW_MS=0)
+        self.assertIn('"queries"', logs.output[0])
+        self.assertIn('role_flags', logs.output[0])
+
+    def test_sampled_requests_dump_cprofile(self):
+        dump_dir = self.temp_dir()
+        with self.assertLogs('incidents.middleware', level='WARNING'):
+            self._get(INCIDENT_PROFILING=True, INCIDENT_PROFILING_SLOW_MS=0,
+                      INCIDENT_PROFILING_SAMPLE_RATE=1.0, INCIDENT_PROFILING_DUMP_DIR=dump_dir)
+        self.assertEqual(len(os.listdir(dump_dir)), 1)
+
+
+class MetricsEndpointTest(IncidentTestCase):    # Test the Prometheus metrics registry and endpoint
+    def setUp(self):
+        self.use_settings(INCIDENT_METRICS_DIR=self.temp_dir(), INCIDENT_METRICS_TOKEN='')
+        self.client = Client()
+        self.admin = User.objects.create_superuser(username='boss', password='testpass123')
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def test_endpoint_requires_admin_or_token(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        with override_settings(INCIDENT_METRICS_TOKEN='s3cret'):
+            response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_request_and_incident_metrics_are_exposed(self):
+        self.client.force_login(self.user)
+        self.client.post('/incidents/create/', {'title': 'Down', 'description': 'x', 'severity': 'HIGH'})
+        self.client.force_login(self.admin)
+        body = self.client.get('/metrics/').content.decode()
+        self.assertIn('ims_incidents_created_total{severity="HIGH"}', body)
+        self.assertIn('ims_http_request_duration_seconds_bucket{view="create_incident",le="+Inf"}', body)
+        self.assertIn('ims_db_queries_total{view="create_incident"}', body)
+        self.assertIn('ims_unassigned_incidents 1', body)
+
+    def test_queue_depth_tracks_assignment_and_resolution(self):
+        incident = Incident.objects.create(title='Down', description='x', created_by=self.user)
+        self.assertEqual(StatCounter.objects.get(name=UNASSIGNED_OPEN).value, 1)
+        incident = Incident.objects.get(pk=incident.pk)
+        incident.status = 'RESOLVED'
+        incident.save()
+        self.assertEqual(StatCounter.objects.get(name=UNASSIGNED_OPEN).value, 0)
+
+    def test_scrape_never_reads_incident_table(self):
+        with CaptureQueriesContext(connection) as ctx:
+            render_prometheus()
+        self.assertFalse(any('incidents_incident' in q['sql'] for q in ctx.captured_queries))
+
+    def test_cache_lookups_are_counted_per_alias(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        self.use_settings(CACHES={**settings.CACHES, 'default': locmem, 'other': {**locmem, 'LOCATION': 'other'}})
+        self.client.force_login(self.admin)
+        self.client.get('/incidents/user/')    # Instruments this thread's cache instances
+        caches['other'].get('missing-key')
+        body = render_prometheus()
+        self.assertIn('ims_cache_requests_total{cache="other",result="miss"} 1', body)
+        self.assertNotIn('counted', vars(LocMemCache.get))   # Backend class left alone
+
+    def _write_snapshot(self, filename, value):
+        with open(os.path.join(settings.INCIDENT_METRICS_DIR, filename), 'w') as fh:
+            json.dump({'counters': [['ims_attachment_bytes_total', [], value]], 'histograms': []}, fh)
+
+    def test_worker_snapshots_are_summed(self):
+        live = subprocess.Popen(['sleep', '30'])
+        self.addCleanup(live.kill)
+        self._write_snapshot(f'worker-{live.pid}.json', 100)
+        self._write_snapshot('aggregate.json', 100)
+        self.assertIn('ims_attachment_bytes_total 200', render_prometheus())
+
+    def test_dead_worker_files_fold_into_aggregate(self):
+        dead = subprocess.Popen(['true'])
+        dead.wait()
+        self._write_snapshot(f'worker-{dead.pid}.json', 100)
+        self._write_snapshot('aggregate.json', 50)
+        self.assertIn('ims_attachment_bytes_total 150', render_prometheus())
+        self.assertIn('ims_attachment_bytes_total 150', render_prometheus())     # Folded exactly once
+        self.assertNotIn(f'worker-{dead.pid}.json', self._snapshots())
+        self.assertIn('aggregate.json', self._snapshots())
+
+    def _snapshots(self):
+        directory = settings.INCIDENT_METRICS_DIR
+        return sorted(n for n in os.listdir(directory) if n.endswith('.json')) if os.path.isdir(directory) else []
+
+    def test_only_active_non_empty_registries_write(self):
+        idle = Registry()
+        idle.inc('ims_attachment_bytes_total', 10)
+        idle.flush(force=True)     # Never activated: a management command or cron job
+        empty = Registry()
+        with mock.patch('incidents.metrics.atexit.register'):
+            empty.activate()
+        empty.flush(force=True)
+        self.assertEqual(self._snapshots(), [])
+
+    def test_forked_worker_keeps_its_first_counts(self):
+        registry.inc('ims_test_forked_total', 1000)     # Parent's counts must not leak into the child
+        pid = os.fork()
+        if pid == 0:
+            try:
+                registry.inc('ims_test_forked_total', 7)
+                registry.activate()
+                registry.flush(force=True)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        with open(os.path.join(settings.INCIDENT_METRICS_DIR, f'worker-{pid}.json')) as fh:
+            counters = json.load(fh)['counters']
+        self.assertEqual(counters, [['ims_test_forked_total', [], 7]])
+
+
+class StaticAssetPipelineTest(IncidentTestCase):    # Test hashed, precompressed static bundles
+    def test_collectstatic_writes_hashed_and_gzip_variants(self):
+        static_root = self.temp_dir()
+        with override_settings(STATIC_ROOT=static_root, STORAGES=PROJECT_STORAGES):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        names = os.listdir(os.path.join(static_root, 'incidents', 'css'))
+        hashed = [n for n in names if n.startswith('base.') and n.endswith('.css') and n != 'base.css']
+        self.assertEqual(len(hashed), 1)
+        self.assertIn(hashed[0] + '.gz', names)
+
+    def test_missing_manifest_entry_only_tolerated_in_debug(self):
+        storage = CompressedManifestStaticFilesStorage(location=self.temp_dir())
+        with self.assertRaises(ValueError):
+            storage.stored_name('incidents/css/base.css')
+        with override_settings(DEBUG=True):
+            self.assertEqual(storage.stored_name('incidents/css/base.css'), 'incidents/css/base.css')
+
+    def test_dashboards_link_stylesheets_instead_of_inlining(self):
+        user = User.objects.create_superuser(username='boss', password='testpass123')
+        self.client.force_login(user)
+        response = self.client.get('/incidents/admin-view/')
+        self.assertNotContains(response, '<style>')
+        self.assertContains(response, 'incidents/css/admin_dashboard')
+
+    def test_html_is_gzipped(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_login(user)
+        response = self.client.get('/incidents/user/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class SessionStorageTest(IncidentTestCase):     # Test session/message configuration and cleanup
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def test_dashboard_reads_do_not_query_session_table(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/incidents/user/')
+        self.assertFalse(any('django_session' in q['sql'] for q in ctx.captured_queries))
+
+    def test_logout_ends_cached_session_in_every_worker(self):
+        self.client.force_login(self.user)
+        key = self.client.session.cache_key
+        other_worker = caches.create_connection('sessions')     # Separate backend instance
+        self.assertIsNotNone(other_worker.get(key))
+        self.client.get('/logout/')
+        self.assertIsNone(other_worker.get(key))
+
+    def test_unknown_session_backend_is_rejected(self):
+        with mock.patch.dict(os.environ, {'INCIDENT_SESSION_BACKEND': 'redis'}):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'INCIDENT_SESSION_BACKEND must be one of'):
+                runpy.run_path(os.path.join(settings.BASE_DIR, 'Incident_MSystem', 'settings.py'))
+
+    def test_flash_message_survives_redirect_in_cookie(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            '/incidents/create/', {'title': 'Down', 'description': 'x', 'severity': 'LOW'}, follow=True)
+        self.assertIn('messages', response.cookies)
+        self.assertContains(response, 'Incident created.')
+
+    def test_cleanup_removes_only_expired_sessions(self):
+        now = timezone.now()
+        Session.objects.create(session_key='old', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+        call_command('cleanup_sessions', batch_size=1, pause=0, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+class AdminChangelistTest(IncidentTestCase):    # Test the scalable Incident / IncidentComment admin
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='boss', password='testpass123')
+        self.user = User.objects.create_user(username='reporter', password='testpass123')
+        self.disk = Incident.objects.create(
+            title='Disk full on web-03', description='The nightly backup filled /var', created_by=self.user)
+        self.vpn = Incident.objects.create(
+            title='VPN drops', description='Tunnel resets every hour', created_by=self.admin)
+        for i in range(5):
+            IncidentComment.objects.create(incident=self.vpn, author=self.user, text=f'note {i}')
+        self.client.force_login(self.admin)
+
+    def _search(self, url, term):
+        return self.client.get(url, {'q': term}).context['cl'].result_list
+
+    def test_full_text_search_matches_description_words(self):
+        results = self._search('/admin/incidents/incident/', 'backup')
+        self.assertEqual(list(results), [self.disk])
+
+    def test_full_text_index_follows_updates(self):
+        self.vpn.description = 'Tunnel resets after certificate rotation'
+        self.vpn.save()
+        self.assertEqual(list(self._search('/admin/incidents/incident/', 'certif')), [self.vpn])
+
+    def test_triggers_dropped_by_table_rebuild_are_restored(self):
+        with connection.cursor() as cursor:    # What SQLite's AlterField table rebuild leaves behind
+            cursor.execute('DROP TRIGGER incidents_incident_fts_au')
+        self.vpn.description = 'Tunnel resets after certificate rotation'
+        self.vpn.save()
+        self.assertEqual(ensure_fts_triggers(), ['incidents_incident_fts_au'])
+        self.assertEqual(ensure_fts_triggers(), [])
+        self.assertEqual(list(self._search('/admin/incidents/incident/', 'certif')), [self.vpn])
+        self.disk.description = 'Rotated logs filled /var'
+        self.disk.save()
+        self.assertEqual(list(self._search('/admin/incidents/incident/', 'rotated')), [self.disk])
+
+    def test_search_by_id_and_username(self):
+        self.assertEqual(list(self._search('/admin/incidents/incident/', str(self.vpn.pk))), [self.vpn])
+        self.assertEqual(list(self._search('/admin/incidents/incident/', 'reporter')), [self.disk])
+
+    def test_comment_changelist_query_count_is_flat(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/admin/incidents/incidentcomment/')
+        for i in range(20):
+            IncidentComment.objects.create(incident=self.disk, author=self.admin, text=f'more {i}')
+        with CaptureQueriesContext(connection) as many:
+            self.client.get('/admin/incidents/incidentcomment/')
+        self.assertEqual(len(few), len(many))
+
+    def test_large_unfiltered_list_uses_estimate(self):
+        with mock.patch.object(incident_admin, 'estimate_rows', return_value=2000000):
+            response = self.client.get('/admin/incidents/incident/')
+        self.assertEqual(response.context['cl'].result_count, 2000000)
+
+    def test_incident_autocomplete_uses_index_search(self):
+        response = self.client.get('/admin/autocomplete/', {
+            'app_label': 'incidents', 'model_name': 'incidentcomment', 'field_name': 'incident', 'term': 'vpn'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [str(self.vpn.pk)])
+
+
+class RateLimitTest(IncidentTestCase):  # Test token-bucket throttling of incident and comment posts
+    def setUp(self):
+        self.bucket_db = os.path.join(self.temp_dir(), 'ratelimit.sqlite3')
+        limits = {'user': (2, 60), 'support': (4, 60), 'admin': (6, 60), 'ip': (3, 60)}
+        self.use_settings(INCIDENT_RATE_LIMITING=True, INCIDENT_RATE_LIMITS=limits,
+                          INCIDENT_RATELIMIT_DB=self.bucket_db)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_login(self.user)
+
+    def _report(self, n, **extra):
+        return self.client.post('/incidents/create/', {
+            'title': f'Report {"abcdefghijk"[n]}', 'description': 'x', 'severity': 'LOW'}, **extra)
+
+    def test_burst_then_429_with_retry_after(self):
+        self.assertEqual(self._report(1).status_code, 302)
+        self.assertEqual(self._report(2).status_code, 302)
+        response = self._report(3)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Incident.objects.count(), 2)
+
+    def test_get_is_never_limited(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get('/incidents/create/').status_code, 200)
+
+    def test_limits_follow_role(self):
+        support = Group.objects.create(name='Support')
+        self.user.groups.add(support)
+        codes = [self._report(n).status_code for n in range(5)]
+        self.assertEqual(codes, [302, 302, 302, 302, 429])
+
+    def test_client_ip_bucket_is_shared_between_users(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        with override_settings(INCIDENT_RATE_LIMITS={'user': (10, 60), 'ip': (3, 60)}):
+            for n in range(3):
+                client = self.client if n % 2 else Client()
+                client.force_login(self.user if n % 2 else other)
+                self.assertEqual(client.post('/incidents/create/', {
+                    'title': f'From office {"xyz"[n]}', 'description': 'x', 'severity': 'LOW'},
+                    HTTP_X_REAL_IP='203.0.113.7').status_code, 302)
+            self.assertEqual(self._report(9, HTTP_X_REAL_IP='203.0.113.7').status_code, 429)
+            self.assertEqual(self._report(10, HTTP_X_REAL_IP='198.51.100.1').status_code, 302)
+
+    def test_ip_header_ignored_unless_sent_by_trusted_proxy(self):
+        with override_settings(INCIDENT_RATE_LIMITS={'user': (10, 60), 'ip': (3, 60)}):
+            codes = [
+                self._report(n, REMOTE_ADDR='203.0.113.9', HTTP_X_REAL_IP=f'198.51.100.{n}').status_code
+                for n in range(4)
+            ]
+            self.assertEqual(codes, [302, 302, 302, 429])   # One bucket for 203.0.113.9
+            with override_settings(INCIDENT_RATELIMIT_TRUSTED_PROXIES=['203.0.113.9']):
+                self.assertEqual(self._report(5, REMOTE_ADDR='203.0.113.9',
+                                              HTTP_X_REAL_IP='198.51.100.5').status_code, 302)
+
+    def test_comments_have_their_own_bucket(self):
+        incident = Incident.objects.create(title='Outage', description='x', created_by=self.user)
+        url = f'/incidents/{incident.pk}/'
+        self._report(1)
+        self._report(2)
+        self.assertEqual(self.client.post(url, {'text': 'one'}).status_code, 302)
+        self.assertEqual(self.client.post(url, {'text': 'two'}).status_code, 302)
+        self.assertEqual(self.client.post(url, {'text': 'three'}).status_code, 429)
+
+    def test_tokens_refill_over_time(self):
+        store = BucketStore(self.bucket_db)
+        bucket = [('k', 1, 0.5)]
+        self.assertEqual(store.take(bucket, now=100.0), (True, 0.0))
+        allowed, retry_after = store.take(bucket, now=101.0)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 1.0)
+        self.assertTrue(store.take(bucket, now=102.0)[0])
+
+    def test_store_failure_lets_requests_through(self):
+        with mock.patch.object(BucketStore, 'take', side_effect=sqlite3.OperationalError('locked')):
+            with self.assertLogs('incidents.ratelimit', level='ERROR'):
+                self.assertEqual(self._report(1).status_code, 302)
+
+
+class SimilarIncidentTest(IncidentTestCase):    # Test the TF-IDF similar-incident index and suggestions
+    def setUp(self):
+        self.index_path = os.path.join(self.temp_dir(), 'similarity.joblib')
+        self.use_settings(INCIDENT_SIMILARITY_INDEX=self.index_path, INCIDENT_SIMILARITY_REFRESH_SECONDS=0)
+        loaded.index = None
+        self.addCleanup(setattr, loaded, 'index', None)
+
+        self.admin = User.objects.create_superuser(username='boss', password='testpass123')
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.vpn = Incident.objects.create(
+            title='VPN tunnel drops', description='The VPN client disconnects every hour', created_by=self.user)
+        self.printer = Incident.objects.create(
+            title='Printer offline', description='Second floor printer shows paper jam', created_by=self.user)
+        Incident.objects.create(
+            title='VPN disconnecting', description='Tunnel keeps dropping after login', created_by=self.admin)
+
+    def _build(self):
+        save_index(build_index(batch_size=2, n_jobs=1))
+
+    def test_tokenizer_stems_and_drops_stop_words(self):
+        self.assertEqual(tokenize('The printers are jammed on web-03'), ['printer', 'jam', 'web'])
+
+    def test_query_ranks_by_shared_terms(self):
+        index = build_index(batch_size=2, n_jobs=1)
+        ranked = index.query('VPN drops', 'tunnel disconnects', k=5)
+        self.assertEqual(ranked[0][0], self.vpn.pk)
+        self.assertNotIn(self.printer.pk, [pk for pk, _ in ranked])
+        self.assertEqual(index.query('unrelated words', ''), [])
+
+    def test_rewritten_index_is_loaded_in_background(self):
+        self._build()
+        first = loaded.get()
+        self._build()
+        mtime = os.stat(self.index_path).st_mtime + 10
+        os.utime(self.index_path, (mtime, mtime))
+        self.assertIs(loaded.get(), first)     # Requests keep the copy in memory meanwhile
+        reloader = loaded.reloader
+        if reloader is not None:
+            reloader.join()
+        self.assertIsNot(loaded.get(), first)
+        self.assertEqual(loaded.mtime, mtime)
+
+    def test_detail_page_suggests_visible_matches_only(self):
+        self._build()
+        self.client.force_login(self.admin)
+        similar = self.client.get(f'/incidents/{self.vpn.pk}/').context['similar']
+        self.assertEqual([i.title for i in similar], ['VPN disconnecting'])
+
+        self.client.force_login(self.user)     # The other VPN report belongs to the admin
+        self.assertEqual(self.client.get(f'/incidents/{self.vpn.pk}/').context['similar'], [])
+
+    def test_support_sees_resolved_matches_read_only(self):
+        support = User.objects.create_user(username='helpdesk', password='testpass123')
+        support.groups.add(Group.objects.create(name='Support'))
+        Incident.objects.filter(title='VPN disconnecting').update(status='RESOLVED', is_visible_to_support=False)
+        self._build()
+        self.client.force_login(support)
+        response = self.client.get('/incidents/similar/', {'title': 'vpn tunnel dropping'})
+        [match] = response.context['similar']
+        self.assertEqual(match.title, 'VPN disconnecting')
+        self.assertFalse(match.can_open)
+        self.assertContains(response, 'Tunnel keeps dropping')
+        self.assertNotContains(response, f'href="/incidents/{match.pk}/"')
+
+    def test_visible_match_found_below_hidden_ones(self):
+        Incident.objects.bulk_create([
+            Incident(title='VPN tunnel drops', description='The VPN client disconnects every hour',
+                     created_by=self.admin)
+            for _ in range(30)
+        ])
+        self._build()
+        self.client.force_login(self.user)
+        similar = self.client.get('/incidents/similar/', {'title': 'vpn drops', 'description': 'hourly'}).context
+        self.assertEqual([i.pk for i in similar['similar']], [self.vpn.pk])
+
+    def test_archived_and_restored_incidents_stay_suggestable(self):
+        resolved = Incident.objects.get(title='VPN disconnecting')
+        resolved.status = 'RESOLVED'
+        resolved.save()
+        Incident.objects.filter(pk=resolved.pk).update(updated_at=timezone.now() - timedelta(days=60))
+        self._build()
+        self.client.force_login(self.admin)
+        archive_resolved()
+        self.assertIn(resolved.pk, [i.pk for i in self._suggested('vpn disconnecting')])
+        self._build()   # A rebuild while archived still covers it
+        self.assertIn(resolved.pk, [i.pk for i in self._suggested('vpn disconnecting')])
+        restore_incident(resolved.pk)
+        self.assertIn(resolved.pk, [i.pk for i in self._suggested('vpn disconnecting')])
+
+    def _suggested(self, title):
+        return self.client.get('/incidents/similar/', {'title': title}).context['similar']
+
+    def test_new_incidents_are_picked_up_without_rebuild(self):
+        self._build()
+        self.client.force_login(self.user)
+        self.client.get('/incidents/similar/', {'title': 'warm up'})
+        Incident.objects.create(title='Paper jam again', description='Printer jammed', created_by=self.user)
+        response = self.client.get('/incidents/similar/', {'title': 'printer paper jam'})
+        self.assertContains(response, 'Paper jam again')
+        self.assertContains(response, 'Printer offline')
+
+    def test_suggestions_do_not_scan_incidents(self):
+        self._build()
+        self.client.force_login(self.admin)
+        self.client.get('/incidents/similar/', {'title': 'warm up'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/incidents/similar/', {'title': 'vpn tunnel'})
+        incident_sql = [q['sql'] for q in queries if 'FROM "incidents_incident"' in q['sql']]
+        self.assertTrue(all('WHERE' in sql for sql in incident_sql))
+
+    def test_command_builds_and_updates_index(self):
+        call_command('build_similarity_index', '--jobs', '1', stdout=StringIO())
+        Incident.objects.create(title='Laptop battery', description='Swelling battery', created_by=self.user)
+        out = StringIO()
+        call_command('build_similarity_index', '--update', stdout=out)
+        self.assertIn('Updated', out.getvalue())
+        index = joblib.load(self.index_path)
+        self.assertEqual(len(index), 4)
@@ -9,5 +9,7 @@ urlpatterns = [
     path("admin-my-incidents/", views.admin_my_incidents, name="admin_my_incidents"),
 
     path("create/", views.create_incident, name="create_incident"),
+    path("similar/", views.similar_incidents, name="similar_incidents"),  # Suggestions while typing
     path("<int:pk>/", views.incident_detail, name="incident_detail"),
+    path("<int:pk>/comments/", views.incident_comments, name="incident_comments"),  # Older comment pages
 ]
@@ -1,12 +1,29 @@
 # incidents/views.py
+from itertools import islice
+
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 
+from .assignment import assign_backlog, auto_assign, auto_assign_enabled
+from .comments import comment_page
+from .dedup import register_incident, reported_by
 from .forms import IncidentForm, CommentForm
-from .models import Incident
+from .metrics import render_prometheus
+from .models import ArchivedIncident, Incident
+from .ratelimit import rate_limited
+from .similarity import iter_similar
+
+ADMIN_PAGE_SIZE = 50    # Incidents per admin dashboard page
+SIMILAR_COUNT = 5       # Similar incidents suggested on the detail and create pages
+SIMILAR_MAX_CANDIDATES = 200    # Ranked matches checked against visibility before giving up
 
 
 def is_support_user(user) -> bool:
@@ -21,6 +38,70 @@ def is_support_or_admin(user) -> bool:
     return is_support_user(user) or is_admin_user(user)
 
 
+def can_view_incident(user, incident) -> bool:
+    # visibility rules: admin sees all, support sees assigned, user sees reported & visible
+    if is_admin_user(user):
+        return True
+    if is_support_user(user):
+        return incident.assigned_to_id == user.id and incident.is_visible_to_support
+    if not incident.is_visible_to_user:
+        return False
+    return incident.created_by_id == user.id or incident.reporters.filter(pk=user.pk).exists()
+
+
+def visible_to(user, queryset):
+    # Queryset form of can_view_incident
+    if is_admin_user(user):
+        return queryset
+    if is_support_user(user):
+        return queryset.filter(assigned_to=user, is_visible_to_support=True)
+    return queryset.filter(reported_by(user), is_visible_to_user=True)
+
+
+def suggestion_scope(user):
+    # (incidents the user can open, other incidents shown read-only, archived incidents).
+    # Support get every resolved incident as a title and summary so known fixes turn up;
+    # reporters only ever see their own.
+    if is_admin_user(user):
+        return Incident.objects.all(), Incident.objects.none(), ArchivedIncident.objects.all()
+    openable = visible_to(user, Incident.objects.all())
+    if is_support_user(user):
+        return openable, Incident.objects.filter(status="RESOLVED"), ArchivedIncident.objects.all()
+    return openable, Incident.objects.none(), ArchivedIncident.objects.none()
+
+
+def suggest_similar(user, title, description, exclude=()):
+    # Best matches from the precomputed index that this user may see, pulling ranked
+    # candidates in chunks until enough pass the visibility rules
+    openable, read_only, archived = suggestion_scope(user)
+    admin = is_admin_user(user)
+    ranked = iter_similar(title, description, exclude=exclude)
+    matches = []
+    checked = 0
+    while len(matches) < SIMILAR_COUNT and checked < SIMILAR_MAX_CANDIDATES:
+        chunk = list(islice(ranked, SIMILAR_COUNT * 4))
+        if not chunk:
+            break
+        checked += len(chunk)
+        ids = [pk for pk, _ in chunk]
+        found = {pk: (incident, True) for pk, incident in openable.in_bulk(ids).items()}
+        rest = [pk for pk in ids if pk not in found]
+        found.update((pk, (incident, False)) for pk, incident in read_only.in_bulk(rest).items())
+        rest = [pk for pk in rest if pk not in found]
+        found.update((pk, (incident, admin)) for pk, incident in archived.in_bulk(rest).items())
+        for pk, score in chunk:
+            if pk in found:
+                incident, can_open = found[pk]
+                incident.can_open = can_open
+                incident.similarity = score
+                matches.append(incident)
+    return matches[:SIMILAR_COUNT]
+
+
+def is_fragment_request(request) -> bool:  # Posted by the page script rather than a plain form
+    return request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+
 @login_required
 def login_redirect(request):  # Redirect based on role
     user = request.user
@@ -39,10 +120,10 @@ def logout_view(request):   # Logout and redirect to login
 
 @login_required
 def user_dashboard(request):     # User-facing portal: report incident + list own incidents
-    incidents = Incident.objects.filter(    # Only incidents created by this user and visible
-        created_by=request.user,
+    incidents = Incident.objects.filter(    # Only incidents this user reported and visible
+        reported_by(request.user),
         is_visible_to_user=True,
-    ).order_by("-created_at")   # Most recent first
+    ).select_related("assigned_to").order_by("-created_at")   # Most recent first
 
     return render(
         request,
@@ -58,13 +139,14 @@ def support_dashboard(request):
     incidents = Incident.objects.filter(    # Only assigned and visible to support
         assigned_to=request.user,
         is_visible_to_support=True,
-    ).order_by("-created_at")
+    ).select_related("created_by").order_by("-created_at")
 
     # Simple metrics for this support user
     total_incidents = incidents.count()   # Total assigned incidents
     critical_count = incidents.filter(severity="CRITICAL").count()   # Critical severity incidents
     open_count = incidents.filter(status="OPEN").count()   # Open status incidents
     resolved_count = incidents.filter(status="RESOLVED").count()   # Resolved status incidents
+    breached_count = incidents.filter(sla_breached_at__isnull=False).exclude(status="RESOLVED").count()
 
     # Handle close from support dashboard
     if request.method == "POST":
@@ -91,6 +173,7 @@ def support_dashboard(request):
             "critical_count": critical_count,
             "open_count": open_count,
             "resolved_count": resolved_count,
+            "breached_count": breached_count,
         },
     )
 
@@ -100,7 +183,7 @@ def support_dashboard(request):
 def admin_my_incidents(request):
     incidents = Incident.objects.filter(
         assigned_to=request.user
-    ).order_by("-created_at")
+    ).select_related("created_by").order_by("-created_at")
 
     return render(
         request,
@@ -117,6 +200,12 @@ def admin_dashboard(request):   # Admin overview of all incidents with inline up
         incident_id = request.POST.get("incident_id")
         action = request.POST.get("action")
 
+        # AUTO-ASSIGN the whole unassigned backlog
+        if action == "auto_assign":
+            assigned = assign_backlog()
+            messages.success(request, f"Auto-assigned {assigned} incident(s).")
+            return redirect("admin_dashboard")
+
         incident = get_object_or_404(Incident, pk=incident_id)  # Admin can access all incidents
 
         # UPDATE (Assign + Status)
@@ -126,7 +215,9 @@ def admin_dashboard(request):   # Admin overview of all incidents with inline up
 
             #  Assignment LOCK: only assign if NONE
             if incident.assigned_to is None:
-                if assigned_to_id:
+                if assigned_to_id == "auto":
+                    pass    # Picked after the status change below
+                elif assigned_to_id:
                     assigned_user = get_object_or_404(User, id=assigned_to_id)
                     incident.assigned_to = assigned_user
             # else → ignore reassignment completely
@@ -141,6 +232,8 @@ def admin_dashboard(request):   # Admin overview of all incidents with inline up
                 incident.is_visible_to_support = False
 
             incident.save()
+            if assigned_to_id == "auto":
+                auto_assign(incident)
             messages.success(request, "Incident updated.")
             return redirect("admin_dashboard")
 
@@ -156,39 +249,49 @@ def admin_dashboard(request):   # Admin overview of all incidents with inline up
     # Filters
     status_filter = request.GET.get("status", "")
     severity_filter = request.GET.get("severity", "")
+    sla_filter = request.GET.get("sla", "")
 
-    incidents = Incident.objects.all().order_by("-created_at")
+    incidents = Incident.objects.select_related("created_by", "assigned_to").order_by("-created_at")
 
     if status_filter:
         incidents = incidents.filter(status=status_filter)
     if severity_filter:
         incidents = incidents.filter(severity=severity_filter)
+    if sla_filter == "breached":
+        incidents = incidents.filter(sla_breached_at__isnull=False).exclude(status="RESOLVED")
+
+    page_obj = Paginator(incidents, ADMIN_PAGE_SIZE).get_page(request.GET.get("page"))
 
     # Stats
     total_incidents = Incident.objects.count()
     critical_count = Incident.objects.filter(severity="CRITICAL").count()
     open_count = Incident.objects.filter(status="OPEN").count()
     resolved_count = Incident.objects.filter(status="RESOLVED").count()
+    breached_count = Incident.objects.filter(sla_breached_at__isnull=False).exclude(status="RESOLVED").count()
 
-    support_users = User.objects.filter(groups__name="Support")
+    support_users = User.objects.filter(groups__name="Support").select_related("workload")
 
     return render(
         request,
         "incidents/admin_dashboard.html",
         {
-            "incidents": incidents,
+            "incidents": page_obj.object_list,
+            "page_obj": page_obj,
             "support_users": support_users,
             "total_incidents": total_incidents,
             "critical_count": critical_count,
             "open_count": open_count,
             "resolved_count": resolved_count,
+            "breached_count": breached_count,
             "status_filter": status_filter,
             "severity_filter": severity_filter,
+            "sla_filter": sla_filter,
         },
     )
 
 
 @login_required
+@rate_limited("incident")
 def create_incident(request):    # Handle incident creation form submission
     if request.method == "POST":
         form = IncidentForm(request.POST, request.FILES)
@@ -196,8 +299,16 @@ def create_incident(request):    # Handle incident creation form submission
             incident = form.save(commit=False)
             incident.created_by = request.user
             incident.status = "OPEN"
-            incident.save()
-            messages.success(request, "Incident created.")
+            incident, created = register_incident(incident, request.user)
+            if created:
+                if auto_assign_enabled():
+                    auto_assign(incident)
+                messages.success(request, "Incident created.")
+            else:   # Folded into an open duplicate instead of a new row
+                messages.info(
+                    request,
+                    f"Matches open incident #{incident.pk}; recorded as a repeat occurrence.",
+                )
             if is_admin_user(request.user):
                 return redirect("admin_dashboard")
             if is_support_user(request.user):
@@ -206,30 +317,64 @@ def create_incident(request):    # Handle incident creation form submission
     else:
         form = IncidentForm()
 
+    similar = []
+    if form.is_bound:   # Rejected submission: show what it resembles
+        similar = suggest_similar(request.user, form.data.get("title", ""), form.data.get("description", ""))
+
     # Fallback simple template (if you hit /incidents/create/ directly)
     return render(
         request,
         "incidents/create_incident.html",
-        {"form": form},
+        {"form": form, "similar": similar},
     )
 
 
 @login_required
-def incident_detail(request, pk: int):
-    incident = get_object_or_404(Incident, pk=pk)
+def similar_incidents(request):    # Suggestions for a draft report, as an HTML fragment
+    similar = suggest_similar(
+        request.user,
+        request.GET.get("title", "")[:200],
+        request.GET.get("description", "")[:2000],
+    )
+    return render(request, "incidents/similar_list.html", {"similar": similar})
 
-    # visibility rules: admin sees all, support sees assigned, user sees own & visible
+
+def archived_incident_detail(request, pk: int):  # Read-only view of an archived incident
+    archived = get_object_or_404(ArchivedIncident, pk=pk)
+
+    # Archived incidents are resolved, so only admins can still see them
     if not is_admin_user(request.user):
+        messages.error(request, "You are not allowed to view this incident.")
         if is_support_user(request.user):
-            if incident.assigned_to != request.user or not incident.is_visible_to_support:
-                messages.error(
-                    request, "You are not allowed to view this incident.")
-                return redirect("support_dashboard")
-        else:
-            if incident.created_by != request.user or not incident.is_visible_to_user:
-                messages.error(
-                    request, "You are not allowed to view this incident.")
-                return redirect("user_dashboard")
+            return redirect("support_dashboard")
+        return redirect("user_dashboard")
+
+    comments, next_cursor = comment_page(archived.comments.all())
+
+    return render(
+        request,
+        "incidents/incident_detail.html",
+        {
+            "incident": archived,
+            "comments": comments,
+            "next_cursor": next_cursor,
+            "archived": True,
+        },
+    )
+
+
+@login_required
+@rate_limited("comment")
+def incident_detail(request, pk: int):
+    incident = Incident.objects.filter(pk=pk).first()
+    if incident is None:    # Fall back to the archive tier
+        return archived_incident_detail(request, pk)
+
+    if not can_view_incident(request.user, incident):
+        messages.error(request, "You are not allowed to view this incident.")
+        if is_support_user(request.user):
+            return redirect("support_dashboard")
+        return redirect("user_dashboard")
 
     if request.method == "POST":
         form = CommentForm(request.POST)
@@ -238,22 +383,55 @@ def incident_detail(request, pk: int):
             comment.incident = incident
             comment.author = request.user
             comment.save()
+            if is_fragment_request(request):    # Just the new comment, no full re-render
+                return HttpResponse(
+                    render_to_string("incidents/comment_item.html", {"c": comment}),
+                    status=201,
+                )
             messages.success(request, "Comment added.")
             return redirect("incident_detail", pk=pk)
+        if is_fragment_request(request):
+            return JsonResponse({"errors": form.errors}, status=400)
     else:
         form = CommentForm()
 
+    comments, next_cursor = comment_page(incident.comments.all())
+
     return render(
         request,
         "incidents/incident_detail.html",
         {
             "incident": incident,
-            "comments": incident.comments.all().order_by("-created_at"),
+            "comments": comments,
+            "next_cursor": next_cursor,
             "form": form,
+            "similar": suggest_similar(
+                request.user, incident.title, incident.description, exclude=(incident.pk,)
+            ),
         },
     )
 
 
+@login_required
+def incident_comments(request, pk: int):   # Older comments as an HTML fragment
+    incident = Incident.objects.filter(pk=pk).first()
+    if incident is None:
+        incident = get_object_or_404(ArchivedIncident, pk=pk)
+        allowed = is_admin_user(request.user)
+    else:
+        allowed = can_view_incident(request.user, incident)
+    if not allowed:
+        return HttpResponseForbidden()
+
+    comments, next_cursor = comment_page(incident.comments.all(), request.GET.get("cursor"))
+    response = HttpResponse(
+        render_to_string("incidents/comment_list.html", {"comments": comments})
+    )
+    if next_cursor:
+        response["X-Next-Cursor"] = next_cursor
+    return response
+
+
 @login_required
 def close_incident(request, pk: int):
     incident = get_object_or_404(Incident, pk=pk)
@@ -283,3 +461,15 @@ def close_incident(request, pk: int):
         "incidents/close_incident.html",
         {"incident": incident},
     )
+
+
+def metrics_endpoint(request):  # Prometheus scrape target; never queries the Incident table
+    token = getattr(settings, "INCIDENT_METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        allowed = constant_time_compare(supplied, token)
+    else:
+        allowed = is_admin_user(request.user)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")